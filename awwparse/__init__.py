@@ -7,11 +7,13 @@
     :license: BSD, see LICENSE.rst for details
 """
 from __future__ import absolute_import
+import io
+import os
 import sys
-import textwrap
+from copy import copy, deepcopy
 from types import MethodType
 from functools import partial
-from itertools import takewhile, chain
+from itertools import takewhile
 from collections import deque
 
 import six
@@ -20,12 +22,13 @@ from six.moves import reduce
 
 from awwparse.utils import (
     set_attributes_from_kwargs, force_list, get_terminal_width, golden_split,
-    set_attributes, Signature, iter_mapping, create_repr, OrderedDict,
-    ensure_all
+    Signature, iter_mapping, create_repr, OrderedDict, import_string,
+    LRUCache, PrefixTrie, ImmutableMapping, missing
 )
 from awwparse.exceptions import (
     CommandMissing, OptionConflict, CommandConflict, UnexpectedArgument,
-    PositionalConflict, PositionalArgumentMissing, CLIError, EndOptionParsing
+    PositionalConflict, PositionalArgumentMissing, CLIError, EndOptionParsing,
+    ResponseFileError, AmbiguousArgument, HelpRequested
 )
 
 from awwparse.positionals import (
@@ -34,25 +37,198 @@ from awwparse.positionals import (
     File, Resource, LocalResource
 )
 from awwparse.actions import store_last, append_to_list, add_to_set, add, sub
+from awwparse.namespaces import Namespace, create_namespace_class
+
+
+class ResponseFiles(object):
+    """
+    Expands arguments of the form ``@path`` into the arguments contained in
+    the file at `path`, allowing applications to receive more arguments than
+    the operating system permits on the command line.
+
+    Arguments in the file are separated by `delimiter`, which is a newline by
+    default and may be ``"\\0"`` for files written by e.g. ``find -print0``.
+    Other characters, including carriage returns, are kept as they are,
+    except for a carriage return preceding a newline delimiter. Empty
+    arguments are ignored. If `shell_quoted` is ``True`` each delimited
+    part is split like a shell would, so that a line may contain several
+    quoted arguments.
+
+    Files are read lazily in blocks of `buffer_size` characters, so that
+    memory usage does not depend on the size of the file. Response files may
+    refer to other response files, a
+    :exc:`~awwparse.exceptions.ResponseFileError` is raised if a file cannot
+    be read, decoded or split or if it refers to itself.
+    """
+    def __init__(self, prefix="@", delimiter="\n", shell_quoted=False,
+                 encoding=None, buffer_size=2 ** 16):
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self.shell_quoted = shell_quoted
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+
+    def is_response_file(self, argument):
+        return (
+            isinstance(argument, six.string_types) and
+            len(argument) > len(self.prefix) and
+            argument.startswith(self.prefix)
+        )
+
+    def expand(self, arguments, _including=()):
+        """
+        Yields the given `arguments` with response files expanded.
+        """
+        for argument in arguments:
+            if self.is_response_file(argument):
+                path = argument[len(self.prefix):]
+                for argument in self._expand_file(path, _including):
+                    yield argument
+            else:
+                yield argument
+
+    def _expand_file(self, path, including):
+        real_path = os.path.realpath(path)
+        if real_path in including:
+            raise ResponseFileError(
+                u("response file {0!r} includes itself").format(path)
+            )
+        try:
+            # newlines are not translated, they may be part of arguments
+            file = io.open(path, encoding=self.encoding, newline="")
+        except (IOError, OSError) as error:
+            raise ResponseFileError(
+                u("cannot read response file {0!r}: {1}").format(
+                    path, error.strerror
+                )
+            )
+        with file:
+            for argument in self.expand(
+                self._read_arguments(path, file), including + (real_path, )
+            ):
+                yield argument
+
+    def _read_arguments(self, path, file):
+        remainder = u("")
+        while True:
+            try:
+                block = file.read(self.buffer_size)
+            except UnicodeDecodeError as error:
+                raise ResponseFileError(
+                    u("cannot decode response file {0!r}: {1}").format(
+                        path, error.reason
+                    )
+                )
+            if not block:
+                break
+            parts = (remainder + block).split(self.delimiter)
+            remainder = parts.pop()
+            for part in parts:
+                for argument in self._split(path, part):
+                    yield argument
+        for argument in self._split(path, remainder):
+            yield argument
+
+    def _split(self, path, part):
+        if self.delimiter == u("\n") and part.endswith(u("\r")):
+            # the line has been terminated with "\r\n"
+            part = part[:-1]
+        if self.shell_quoted:
+            import shlex
+            try:
+                return shlex.split(part)
+            except ValueError as error:
+                raise ResponseFileError(
+                    u("cannot split {0!r} in response file {1!r}: {2}").format(
+                        part, path, error
+                    )
+                )
+        return [part] if part else []
 
 
 class Arguments(object):
-    def __init__(self, arguments, application_name=None):
-        self._arguments = iter(arguments)
-        self._remaining = deque()
-        if application_name is None:
-            self.trace = [[]]
+    """
+    A cursor over the given `arguments`, which keeps track of the arguments
+    that have been consumed in frames, one for each command.
+
+    Lists and tuples are used as they are, other iterables are consumed
+    lazily, so that response files are only read as far as needed.
+    """
+    __slots__ = (
+        "_arguments", "_iterator", "_position", "_frames", "_prefix",
+        "passthrough_errors", "report_help"
+    )
+
+    def __init__(self, arguments, application_name=None, response_files=None):
+        if response_files is not None:
+            arguments = response_files.expand(arguments)
+        if isinstance(arguments, tuple):
+            self._arguments = arguments
+            self._iterator = None
+        elif isinstance(arguments, list):
+            self._arguments = tuple(arguments)
+            self._iterator = None
         else:
-            self.trace = [[application_name], []]
+            # arguments are buffered as they are consumed
+            self._arguments = []
+            self._iterator = iter(arguments)
+        self._position = 0
+        #: The offsets at which the frames start.
+        self._frames = [0]
+        self._prefix = [] if application_name is None else [application_name]
+        #: If ``True`` errors raised while streaming positionals parse the
+        #: remaining arguments are not handled by the command.
+        self.passthrough_errors = False
+        #: If ``True`` the help option raises
+        #: :exc:`~awwparse.exceptions.HelpRequested` instead of printing help
+        #: and exiting.
+        self.report_help = False
+
+    @property
+    def trace(self):
+        """
+        A list of frames, lists of the arguments consumed for each command,
+        preceded by a frame with the application name if given.
+        """
+        frames = [list(self._prefix)] if self._prefix else []
+        ends = self._frames[1:] + [self._position]
+        frames.extend(
+            self._get_arguments(start, end)
+            for start, end in zip(self._frames, ends)
+        )
+        return frames
 
     @property
     def current_frame(self):
-        return self.trace[-1]
+        return self._get_arguments(self._frames[-1], self._position)
+
+    def _get_arguments(self, start, end):
+        # returns a list of the consumed arguments between the offsets
+        return list(self._arguments[start:end])
+
+    def begin_frame(self):
+        """
+        Starts a new frame for the arguments consumed from now on.
+        """
+        self._frames.append(self._position)
 
     def get_used(self, excluding=0):
-        return list(chain.from_iterable(
-            self.trace if excluding == 0 else self.trace[:-excluding]
-        ))
+        """
+        Returns a list of the arguments consumed, excluding the given number
+        of frames from the end.
+        """
+        kept = len(self._prefix) + len(self._frames) - excluding
+        if kept <= 0:
+            return []
+        used = list(self._prefix[:kept])
+        kept -= len(self._prefix)
+        if kept > 0:
+            if kept < len(self._frames):
+                end = self._frames[kept]
+            else:
+                end = self._position
+            used.extend(self._get_arguments(0, end))
+        return used
 
     def __iter__(self):
         return self
@@ -61,23 +237,35 @@ class Arguments(object):
         return self.next()
 
     def next(self):
-        if self._remaining:
-            argument = self._remaining.popleft()
-        else:
-            argument = next(self._arguments)
-        self.current_frame.append(argument)
-        return argument
+        position = self._position
+        if position == len(self._arguments):
+            if self._iterator is None:
+                raise StopIteration()
+            self._arguments.append(next(self._iterator))
+        self._position = position + 1
+        return self._arguments[position]
 
     def rewind(self):
-        self._remaining.append(self.current_frame.pop())
+        if self._position == self._frames[-1]:
+            raise IndexError("no argument to rewind in the current frame")
+        self._position -= 1
+
+    def peek(self):
+        """
+        Returns the next argument without consuming it or
+        :data:`~awwparse.utils.missing` if there is none.
+        """
+        if self._position == len(self._arguments):
+            if self._iterator is None:
+                return missing
+            argument = next(self._iterator, missing)
+            if argument is missing:
+                return missing
+            self._arguments.append(argument)
+        return self._arguments[self._position]
 
     def __nonzero__(self):
-        try:
-            self.next()
-        except StopIteration:
-            return False
-        self.rewind()
-        return True
+        return self.peek() is not missing
 
     def __bool__(self):
         return self.__nonzero__()
@@ -85,11 +273,175 @@ class Arguments(object):
     def __repr__(self):
         return "<{0}({1!r}) {2!r}>".format(
             self.__class__.__name__,
-            self._arguments,
+            self._arguments if self._iterator is None else self._iterator,
             self.get_used()
         )
 
 
+class BoundedArguments(Arguments):
+    """
+    Like :class:`Arguments` but instead of every consumed argument only the
+    arguments commands have been dispatched with and the `trace_size` most
+    recently consumed arguments are kept, so that memory usage does not grow
+    with the number of arguments.
+
+    Usage messages therefore still contain the names of the commands, but
+    may lack options given before them.
+    """
+    __slots__ = ("trace_size", "_recent", "_ahead", "_commands")
+
+    def __init__(self, arguments, application_name=None, response_files=None,
+                 trace_size=16):
+        if response_files is not None:
+            arguments = response_files.expand(arguments)
+        self._arguments = None
+        self._iterator = iter(arguments)
+        self._position = 0
+        self._frames = [0]
+        self._prefix = [] if application_name is None else [application_name]
+        self.passthrough_errors = False
+        self.report_help = False
+        self.trace_size = trace_size
+        #: The most recently consumed arguments, the last one was consumed at
+        #: the offset ``_position - 1``. One more than `trace_size` is kept,
+        #: so that the trace is complete after rewinding.
+        self._recent = deque(maxlen=trace_size + 1)
+        #: Arguments that have been peeked at or rewound.
+        self._ahead = deque()
+        #: A list of ``(offset, argument)`` tuples of the arguments frames
+        #: have been started with.
+        self._commands = []
+
+    def _get_arguments(self, start, end):
+        kept = dict(self._commands)
+        if self.trace_size:
+            recent = list(self._recent)[-self.trace_size:]
+            kept.update(zip(
+                range(self._position - len(recent), self._position), recent
+            ))
+        return [
+            kept[offset] for offset in sorted(kept) if start <= offset < end
+        ]
+
+    def begin_frame(self):
+        if self._position:
+            self._commands.append((self._position - 1, self._recent[-1]))
+        Arguments.begin_frame(self)
+
+    def next(self):
+        if self._ahead:
+            argument = self._ahead.popleft()
+        else:
+            argument = next(self._iterator)
+        self._recent.append(argument)
+        self._position += 1
+        return argument
+
+    def rewind(self):
+        if self._position == self._frames[-1]:
+            raise IndexError("no argument to rewind in the current frame")
+        self._ahead.appendleft(self._recent.pop())
+        self._position -= 1
+
+    def peek(self):
+        if not self._ahead:
+            argument = next(self._iterator, missing)
+            if argument is missing:
+                return missing
+            self._ahead.append(argument)
+        return self._ahead[0]
+
+    def __repr__(self):
+        return "<{0}({1!r}) {2!r}>".format(
+            self.__class__.__name__, self._iterator, self.get_used()
+        )
+
+
+def _index_option(shorts, longs, option):
+    if option.short is not None:
+        shorts[option.short] = option
+    if option.long is not None:
+        longs[option.long] = option
+
+
+def _get_option_name(option):
+    return option.short if option.long is None else option.long
+
+
+def _unindex_option(shorts, longs, option):
+    if shorts.get(option.short) is option:
+        del shorts[option.short]
+    if longs.get(option.long) is option:
+        del longs[option.long]
+
+
+class DispatchIndex(object):
+    """
+    A precompiled index of everything a :class:`Command` matches by name, so
+    that each argument can be resolved with a single lookup.
+    """
+    __slots__ = (
+        "shorts", "longs", "matches", "long_prefixes", "short_characters",
+        "custom_options", "scan_order", "scanned"
+    )
+
+    def __init__(self, command):
+        #: A mapping of all abbreviated option argument names to options.
+        self.shorts = dict(command._option_shorts)
+        #: A mapping of all complete option argument names to options.
+        self.longs = dict(command._option_longs)
+        #: A mapping of arguments to ``(name, match, modified)`` tuples as
+        #: returned by :meth:`Command.get_match`.
+        self.matches = {}
+        for short, option in self.shorts.items():
+            self.matches[short] = (command.options[option], option, "")
+        for long, option in self.longs.items():
+            self.matches[long] = (command.options[option], option, "")
+        for name, subcommand in command.commands.items():
+            self.matches[name] = (name, subcommand, "")
+        #: A :class:`~awwparse.utils.PrefixTrie` of all complete option
+        #: argument names, if the command allows abbreviating them, otherwise
+        #: ``None``.
+        if command.allow_abbreviated_longs:
+            self.long_prefixes = PrefixTrie(self.longs)
+        else:
+            self.long_prefixes = None
+        #: A mapping of option name prefixes to mappings of the characters
+        #: following them in abbreviated option names to ``(name, option)``
+        #: tuples, e.g. ``{"-": {"a": ("foo", option)}}`` for ``-a``.
+        self.short_characters = {}
+        for short, option in self.shorts.items():
+            characters = self.short_characters.setdefault(short[0], {})
+            characters[short[1]] = (command.options[option], option)
+        #: ``True`` if there are options that override :meth:`Option.matches`,
+        #: which may match arguments not covered by the index.
+        self.custom_options = any(
+            six.get_unbound_function(option.__class__.matches) is not
+            six.get_unbound_function(Option.matches)
+            for option in command.options
+        )
+        #: A list of all options in the order in which they are tried, if
+        #: there are custom options.
+        self.scan_order = command._get_scan_order()
+        #: The number of arguments options have been tried with since
+        #: :attr:`scan_order` has been determined.
+        self.scanned = 0
+
+    def decode_cluster(self, argument):
+        """
+        Returns a list of ``(name, option)`` tuples for a cluster of
+        abbreviated option names like ``-abc``, in the order in which they
+        appear, or ``None`` if `argument` is not such a cluster.
+        """
+        characters = self.short_characters.get(argument[:1])
+        if characters is None or len(argument) < 3:
+            return None
+        try:
+            return [characters[character] for character in argument[1:]]
+        except KeyError:
+            return None
+
+
 class CLIAttribute(object):
     def __init__(self, attribute, doc=None):
         self.attribute = attribute
@@ -104,18 +456,130 @@ class CLIAttribute(object):
             raise AttributeError(self.attribute)
 
 
+class LazyCommand(object):
+    """
+    Stands in for a command that is imported from `import_path` (of the form
+    ``"package.module:Name"``) the first time it is dispatched to. If the
+    imported object is a class it is instantiated without arguments.
+
+    `help` and `usage` are shown in the help message of the parent command,
+    which therefore does not have to import the command to list it.
+    """
+    __slots__ = ("import_path", "help", "usage", "parent")
+
+    def __init__(self, import_path, help=None, usage=None):
+        if ":" not in import_path:
+            raise ValueError(
+                "expected 'package.module:Name', got {0!r}".format(import_path)
+            )
+        self.import_path = import_path
+        self.help = help
+        self.usage = usage
+        self.parent = None
+
+    def get_usage(self, arguments=None):
+        return u("") if self.usage is None else self.usage
+
+    def copy(self):
+        return self.__class__(self.import_path, self.help, self.usage)
+
+    def load(self):
+        """
+        Imports and returns the command.
+        """
+        command = import_string(self.import_path)
+        if isinstance(command, type):
+            command = command()
+        return command
+
+    def __repr__(self):
+        return create_repr(
+            self.__class__.__name__,
+            [self.import_path],
+            {"help": self.help, "usage": self.usage}
+        )
+
+
+class _CommandTemplate(object):
+    """
+    The parts of a command that are the same for all instances of a command
+    class created without arguments, as long as the class attributes they
+    have been created from, given as `key`, are the same.
+    """
+    __slots__ = ("key", "options", "positionals", "help")
+
+    def __init__(self, key, options, positionals, help):
+        self.key = key
+        self.options = options
+        self.positionals = positionals
+        self.help = help
+
+
 class Command(object):
     """
     Represents a command of a :class:`CLI` or another command.
+
+    The options, positionals and signature of :meth:`main` of a command class
+    are evaluated once, when the class is instantiated without arguments for
+    the first time, later instances created without arguments get copies of
+    them. They are evaluated again, if :attr:`options`, :attr:`positionals`
+    or :meth:`main` have been replaced or :attr:`options` or
+    :attr:`positionals` have been changed in place.
     """
     #: A mapping of identifiers to options.
     options = []
-    #: A mapping of command names to commands.
+    #: A mapping of command names to commands. Instead of a command an import
+    #: path or a :class:`LazyCommand` may be given to defer importing it.
     commands = {}
     #: A positionals signature.
     positionals = ()
     #: A help message explaining this command.
     help = None
+    #: The number of results :meth:`parse` and :meth:`run` cache, if this is
+    #: not ``0`` a :class:`~awwparse.utils.LRUCache` is created as
+    #: :attr:`parse_cache` on instantiation. Results are cached unless
+    #: arguments have been given as :class:`Arguments` object, defaults have
+    #: been passed or a value has been parsed that is not cacheable such as
+    #: an opener. The cache is cleared whenever options, positionals or
+    #: commands are added to or removed from the command or any command
+    #: below it.
+    parse_cache_size = 0
+
+    #: If ``True`` complete option names can be abbreviated to any prefix
+    #: unique among the complete option names of the command, e.g. ``--verb``
+    #: for ``--verbose``.
+    allow_abbreviated_longs = False
+
+    #: ``True`` once the command has been frozen with :meth:`freeze`.
+    frozen = False
+
+    #: If not ``None`` only the arguments commands have been dispatched with
+    #: and this number of the most recently consumed arguments are kept for
+    #: usage messages, instead of all arguments. This bounds the memory used
+    #: by parsing a huge number of arguments given as iterator, e.g. with a
+    #: streaming positional.
+    trace_size = None
+
+    #: If ``True`` options which may match arguments not covered by the
+    #: :attr:`dispatch_index`, such as options that override
+    #: :meth:`Option.matches`, are tried in the order of how often they have
+    #: matched, instead of the order in which they have been added. This is
+    #: only correct if no argument is matched by more than one option.
+    #:
+    #: Matches are not counted once the command has been frozen, the options
+    #: are then tried in the order learned until :meth:`freeze` was called.
+    adaptive_matching = False
+
+    #: The number of arguments after which the order of the options is
+    #: adapted to the :attr:`match_counts`, if :attr:`adaptive_matching` is
+    #: ``True``.
+    adaptive_matching_interval = 1000
+
+    #: If ``True`` the values of options are collected in a
+    #: :class:`~awwparse.namespaces.Namespace` returned by
+    #: :meth:`get_namespace_class` instead of a dictionary, which uses less
+    #: memory if many results of :meth:`parse` are kept.
+    use_namespaces = False
 
     @classmethod
     def _populate_from_signature(cls, command, signature):
@@ -232,7 +696,28 @@ class Command(object):
         return decorate
 
     def __init__(self, options=None, commands=None, positionals=None):
+        self._dispatch_index = None
+        self._namespace_classes = {}
+        self._match_counts = {}
+        self._command_paths = None
+        self.parent = None
+        #: Every command this command has been added to, :attr:`parent` is
+        #: the one it has been added to last.
+        self._parents = []
+        if self.parse_cache_size:
+            self.parse_cache = LRUCache(self.parse_cache_size)
+        else:
+            self.parse_cache = None
+        key = self._get_definition_key()
+        template = self.__class__.__dict__.get("_template")
+        if (template is not None and template.key == key and
+            options is None and commands is None and positionals is None):
+            self._init_from_template(template)
+            return
+
         self.options = OrderedDict()
+        self._option_shorts = {}
+        self._option_longs = {}
         self.add_option("__awwparse_help", HelpOption())
         self.add_options(self.__class__.options)
         if options is not None:
@@ -250,22 +735,84 @@ class Command(object):
         if positionals is not None:
             self.add_positionals(positionals)
 
-        self.parent = None
+        signature = self.__class__.__dict__.get("_signature")
+        if signature is None or signature[0] != key[-1]:
+            signature = self.__class__._signature = (
+                key[-1], Signature.from_method(self.main)
+            )
+        if signature[1].annotations:
+            self._populate_from_signature(self, signature[1])
+        self._add_attribute_commands()
+
+        if options is None and commands is None and positionals is None:
+            # Everything but the commands is the same for all instances
+            # created without arguments, so later ones are created from
+            # copies of this one.
+            self.__class__._template = _CommandTemplate(
+                key,
+                OrderedDict(self.options),
+                list(self.positionals),
+                self.__dict__.get("help", missing)
+            )
 
-        signature = Signature.from_method(self.main)
-        if signature.annotations:
-            self._populate_from_signature(self, signature)
+    def _get_definition_key(self):
+        # the class attributes the template and the signature are created
+        # from, the lists are copied so that changes in place are noticed
+        cls = self.__class__
+        return (
+            list(iter_mapping(cls.options)),
+            list(force_list(cls.positionals)),
+            cls.main
+        )
 
-        for name in dir(self):
-            try:
-                attribute = getattr(self, name)
-            except AttributeError:
-                # maybe raised by properties; can be safely ignored
+    def _init_from_template(self, template):
+        self.options = OrderedDict()
+        self._option_shorts = shorts = {}
+        self._option_longs = longs = {}
+        for option, identifier in template.options.items():
+            option = option.copy()
+            self.options[option] = identifier
+            _index_option(shorts, longs, option)
+        self.commands = OrderedDict()
+        self.add_commands(self.__class__.commands)
+        self.positionals = [
+            copy(positional) for positional in template.positionals
+        ]
+        if template.help is not missing:
+            self.help = template.help
+        self._add_attribute_commands()
+
+    def _find_attribute_commands(self):
+        # looking the commands up in the dictionaries of the classes defined
+        # outside of awwparse is considerably faster than getting every
+        # attribute, which evaluates properties
+        command_names = []
+        seen = set(self.__dict__)
+        for cls in self.__class__.__mro__:
+            if cls.__module__ == __name__ or cls is object:
                 continue
-            if isinstance(attribute, Command):
-                if not isinstance(attribute.main, MethodType):
-                    attribute.main = partial(attribute.main, self)
-                self.add_command(name, attribute)
+            for name, attribute in cls.__dict__.items():
+                if name in seen:
+                    continue
+                seen.add(name)
+                if isinstance(attribute, Command):
+                    command_names.append(name)
+        return sorted(command_names)
+
+    def _add_attribute_commands(self):
+        for name in self._find_attribute_commands():
+            self._add_attribute_command(name, getattr(self, name))
+        for name, attribute in list(self.__dict__.items()):
+            if isinstance(attribute, Command) and name != "parent":
+                self._add_attribute_command(name, attribute)
+
+    def _add_attribute_command(self, name, attribute):
+        if not isinstance(attribute.main, MethodType):
+            # the attribute is shared by all instances, so we bind main of a
+            # copy to this one
+            attribute = attribute.copy()
+            attribute.main = partial(attribute.main, self)
+        self.add_command(name, attribute)
 
     stdin = CLIAttribute("stdin")
     stdout = CLIAttribute("stdout")
@@ -290,25 +837,101 @@ class Command(object):
             option.abbreviation_prefix for option in self.options
         )
 
+    @property
+    def dispatch_index(self):
+        """
+        The :class:`DispatchIndex` of this command. It is built on first
+        access and invalidated whenever options or commands are added or
+        removed.
+        """
+        if self._dispatch_index is None:
+            self._dispatch_index = DispatchIndex(self)
+        return self._dispatch_index
+
+    def _invalidate_dispatch_index(self):
+        self._dispatch_index = None
+        self._namespace_classes = {}
+
+    @property
+    def command_paths(self):
+        """
+        A mapping of paths, tuples of command names such as
+        ``("db", "replica", "promote")``, to every command in the tree below
+        this command, including this command itself as ``()``.
+
+        Commands that have been added lazily and have not been loaded yet are
+        included, commands below them are not. The mapping is built on first
+        access and invalidated whenever commands are added anywhere in the
+        tree, also if the commands below this one have been added to other
+        commands as well.
+        """
+        if self._command_paths is None:
+            command_paths = {}
+            stack = [((), self)]
+            while stack:
+                path, command = stack.pop()
+                command_paths[path] = command
+                if isinstance(command, Command):
+                    stack.extend(
+                        (path + (name, ), subcommand)
+                        for name, subcommand in command.commands.items()
+                    )
+            self._command_paths = command_paths
+        return self._command_paths
+
+    def _iter_ancestors(self):
+        # yields this command and every command above it in any tree it has
+        # been added to
+        seen = set()
+        stack = [self]
+        while stack:
+            command = stack.pop()
+            if id(command) not in seen:
+                seen.add(id(command))
+                yield command
+                stack.extend(command._parents)
+
+    def _invalidate_command_paths(self):
+        for command in self._iter_ancestors():
+            command._command_paths = None
+
+    def _invalidate_parse_caches(self):
+        # the results cached by the commands above this one depend on it
+        for command in self._iter_ancestors():
+            if command.parse_cache is not None:
+                command.parse_cache.clear()
+
+    def get_command(self, path):
+        """
+        Returns the command at `path`, a sequence of command names, loading
+        lazily added commands on the way.
+
+        Raises :exc:`KeyError` if there is no such command.
+        """
+        path = tuple(path)
+        command = self.command_paths.get(path)
+        if isinstance(command, LazyCommand):
+            return command.parent.load_command(path[-1])
+        elif command is None:
+            # the path may lead through commands that have not been loaded
+            command = self
+            for name in path:
+                command = command.load_command(name)
+        return command
+
     @property
     def option_shorts(self):
         """
         A mapping of all abbreviated option argument names to options.
         """
-        return dict(
-            (option.short, option) for option in self.options
-            if option.short is not None
-        )
+        return dict(self._option_shorts)
 
     @property
     def option_longs(self):
         """
         A mapping of all complete option argument names to options.
         """
-        return dict(
-            (option.long, option) for option in self.options
-            if option.long is not None
-        )
+        return dict(self._option_longs)
 
     def get_usage(self, arguments=None):
         result = [] if arguments is None else arguments.get_used(1)
@@ -333,55 +956,108 @@ class Command(object):
         option with the given one.  If `resolve_conflicts` is ``True``
         conflicts on argument names and abbreviations thereof will be resolved
         if possible by removing conflicting attributes.
+
+        The command stores a copy of `option`, so changing `option`
+        afterwards does not affect the command. The positionals of `option`
+        are not copied but shared with it and possibly with other commands,
+        unless they lack a metavar. They must therefore not be changed in
+        place once `option` has been added, replace them instead.
         """
+        self._ensure_not_frozen()
+        option, replaced = self._check_option(
+            identifier, option, self._option_shorts, self._option_longs,
+            force, resolve_conflicts
+        )
+        for conflicting in replaced:
+            self.remove_option(conflicting)
+        self.options[option] = identifier
+        _index_option(self._option_shorts, self._option_longs, option)
+        self._invalidate_dispatch_index()
+        self._invalidate_parse_caches()
+
+    def _check_option(self, identifier, option, shorts, longs, force,
+                      resolve_conflicts):
+        # returns the option as it is to be added along with a list of the
+        # options it replaces, conflicts are looked up in the given `shorts`
+        # and `longs`, which are not modified
         conflicting_options = []
-        if option.short in self.option_shorts:
-            conflicting_options.append(
-                (self.option_shorts[option.short], "short")
-            )
-        if option.long in self.option_longs:
-            conflicting_options.append(
-                (self.option_longs[option.long], "long")
-            )
-        option = option.copy()
-        option.setdefault_metavars(identifier)
+        if option.short in shorts:
+            conflicting_options.append((shorts[option.short], "short"))
+        if option.long in longs:
+            conflicting_options.append((longs[option.long], "long"))
+        # each command has its own option, which shares the positionals with
+        # the given one
+        option = option.with_default_metavars(identifier)
+        replaced = []
         for conflicting, reason in conflicting_options:
             if reason == "short":
                 if resolve_conflicts and option.long is not None:
                     option.short = None
                     continue
                 if force:
-                    self.remove_option(conflicting)
+                    replaced.append(conflicting)
                     continue
             elif reason == "long":
                 if resolve_conflicts and option.short is not None:
                     option.long = None
                     continue
                 if force:
-                    self.remove_option(conflicting)
+                    if conflicting not in replaced:
+                        replaced.append(conflicting)
                     continue
             raise OptionConflict(
                 u("given option {0!r} conflicts with the {1} of {2!r}").format(
                     option, reason, conflicting
                 )
             )
-        self.options[option] = identifier
+        return option, replaced
 
     def add_options(self, options, force=False, resolve_conflicts=False):
         """
-        Adds `options` from a given mapping.
+        Adds `options` from a given mapping like :meth:`add_option`.
+
+        Conflicts are checked for all options before any of them is added,
+        so that the command remains unchanged, if an :exc:`OptionConflict`
+        is raised.
         """
+        self._ensure_not_frozen()
+        shorts = dict(self._option_shorts)
+        longs = dict(self._option_longs)
+        added = OrderedDict()
+        replaced = []
         for identifier, option in iter_mapping(options):
-            self.add_option(
-                identifier, option, force=force,
-                resolve_conflicts=resolve_conflicts
+            option, conflicting_options = self._check_option(
+                identifier, option, shorts, longs, force, resolve_conflicts
             )
+            for conflicting in conflicting_options:
+                _unindex_option(shorts, longs, conflicting)
+                if conflicting in added:
+                    del added[conflicting]
+                else:
+                    replaced.append(conflicting)
+            added[option] = identifier
+            _index_option(shorts, longs, option)
+        for conflicting in replaced:
+            del self.options[conflicting]
+            self._match_counts.pop(conflicting, None)
+        self.options.update(added)
+        self._option_shorts = shorts
+        self._option_longs = longs
+        self._invalidate_dispatch_index()
+        self._invalidate_parse_caches()
 
     def remove_option(self, to_be_removed_option):
         """
         Removes the given option.
         """
+        self._ensure_not_frozen()
         del self.options[to_be_removed_option]
+        _unindex_option(
+            self._option_shorts, self._option_longs, to_be_removed_option
+        )
+        self._match_counts.pop(to_be_removed_option, None)
+        self._invalidate_dispatch_index()
+        self._invalidate_parse_caches()
 
     def add_command(self, name, command, force=False):
         """
@@ -390,15 +1066,44 @@ class Command(object):
         May raise a :exc:`CommandConflict` if `name` is identical to that of
         another command unless `force` is ``True`` in which case the given
         `command` overwrites the confliciting one.
+
+        `command` may also be an import path or a :class:`LazyCommand`, the
+        command is then imported once it is dispatched to.
         """
+        self._ensure_not_frozen()
+        if isinstance(command, six.string_types):
+            command = LazyCommand(command)
         if not force and name in self.commands:
             raise CommandConflict(
                 u("given command {0!r} conflicts with {1!r}").format(
                     command, self.commands[name]
                 )
             )
-        command.parent = self
+        self._adopt(command)
         self.commands[name] = command
+        self._invalidate_dispatch_index()
+        self._invalidate_command_paths()
+        self._invalidate_parse_caches()
+
+    def load_command(self, name):
+        """
+        Returns the command with the given `name`, importing it if it has been
+        added lazily.
+        """
+        command = self.commands[name]
+        if isinstance(command, LazyCommand):
+            command = command.load()
+            self._adopt(command)
+            self.commands[name] = command
+            self._invalidate_dispatch_index()
+            self._invalidate_command_paths()
+            self._invalidate_parse_caches()
+        return command
+
+    def _adopt(self, command):
+        command.parent = self
+        if isinstance(command, Command) and self not in command._parents:
+            command._parents.append(self)
 
     def add_commands(self, commands, force=False):
         """
@@ -415,6 +1120,7 @@ class Command(object):
         remaining command line arguments - in which case the added positional
         would never be reached.
         """
+        self._ensure_not_frozen()
         if positional.metavar is None:
             raise ValueError("metavar not set on: {0!r}".format(positional))
         if self.positionals and self.positionals[-1].remaining:
@@ -424,6 +1130,7 @@ class Command(object):
                 )
             )
         self.positionals.append(positional)
+        self._invalidate_parse_caches()
 
     def add_positionals(self, positionals):
         """
@@ -432,19 +1139,108 @@ class Command(object):
         for positional in positionals:
             self.add_positional(positional)
 
+    def freeze(self):
+        """
+        Freezes this command and all commands below it and returns it.
+
+        Lazily added commands are loaded and everything that is otherwise
+        built on demand, such as the :attr:`dispatch_index`, is built. As
+        parsing keeps its state in the :class:`Arguments` and namespaces of
+        each call, a frozen command can then be shared between threads that
+        call :meth:`parse` and :meth:`run` concurrently.
+
+        Adding or removing options, commands and positionals of a frozen
+        command or setting its :attr:`match_counts` raises a
+        :exc:`TypeError` and :attr:`adaptive_matching` no longer changes the
+        order in which options are tried. Its :attr:`options`,
+        :attr:`commands` and :attr:`positionals` become read-only. Commands
+        are frozen in place, so this affects all trees sharing them.
+
+        The options and positionals themselves are not frozen, changing their
+        attributes after the command has been frozen is not thread-safe.
+        """
+        commands = []
+        stack = [self]
+        while stack:
+            command = stack.pop()
+            if command.frozen:
+                continue
+            commands.append(command)
+            stack.extend(map(command.load_command, list(command.commands)))
+        for command in commands:
+            command.positionals = tuple(command.positionals)
+            command.options = ImmutableMapping(command.options)
+            command.commands = ImmutableMapping(command.commands)
+            command.dispatch_index
+            command.command_paths
+            command.frozen = True
+        return self
+
+    def _ensure_not_frozen(self):
+        if self.frozen:
+            raise TypeError("{0!r} is frozen".format(self))
+
     def copy(self):
-        return self.__class__()
+        """
+        Returns an unfrozen copy of the command with copies of its options,
+        positionals and commands, which can be changed without affecting
+        this command.
+        """
+        command = self.__class__.__new__(self.__class__)
+        command.__dict__.update(self.__dict__)
+        command.__dict__.pop("frozen", None)
+        command._dispatch_index = None
+        command._namespace_classes = {}
+        command._command_paths = None
+        command.parent = None
+        command._parents = []
+        if self.parse_cache is not None:
+            command.parse_cache = LRUCache(self.parse_cache.maxsize)
+        command.options = OrderedDict()
+        command._option_shorts = shorts = {}
+        command._option_longs = longs = {}
+        command._match_counts = {}
+        for option, identifier in self.options.items():
+            copied = option.copy()
+            command.options[copied] = identifier
+            _index_option(shorts, longs, copied)
+            if option in self._match_counts:
+                command._match_counts[copied] = self._match_counts[option]
+        command.positionals = [
+            copy(positional) for positional in self.positionals
+        ]
+        command.commands = OrderedDict()
+        for name, subcommand in self.commands.items():
+            subcommand = subcommand.copy()
+            command._adopt(subcommand)
+            command.commands[name] = subcommand
+        return command
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the index is rebuilt on demand and cached results are not worth
+        # persisting
+        state["_dispatch_index"] = None
+        state["_command_paths"] = None
+        state["_namespace_classes"] = {}
+        if self.parse_cache is not None:
+            state["parse_cache"] = LRUCache(self.parse_cache.maxsize)
+        return state
 
     def set_parent(self, parent):
         self.parent = parent
 
     def is_option(self, argument):
-        return argument in self.option_shorts or argument in self.option_longs
+        index = self.dispatch_index
+        return argument in index.shorts or argument in index.longs
 
     def is_command(self, argument):
         return argument in self.commands
 
     def _print_message(self, message, prefix=None, stream=None):
+        # textwrap is imported here and in _print_columns because it is only
+        # needed for errors and help, which most invocations never print
+        import textwrap
         if prefix is not None:
             message = u("{0}{1}").format(prefix, message)
         if stream is None:
@@ -489,6 +1285,7 @@ class Command(object):
             self._print_commands_help()
 
     def _print_columns(self, header, rows):
+        import textwrap
         self._print_message(header)
         usable_width = self.width - self.section_indent
         right_column_length, left_column_length = golden_split(usable_width)
@@ -548,77 +1345,373 @@ class Command(object):
             )
         )
 
-    def get_match(self, argument):
-        modified_argument = argument
-        if self.is_command(argument):
-            return argument, self.commands[argument], ""
-        elif argument in self.option_longs:
-            option = self.option_longs[argument]
-            return self.options[option], option, ""
-        elif argument in self.option_shorts:
-            option = self.option_shorts[argument]
-            return self.options[option], option, ""
-        else:
-            modified_argument = argument
-            for option, name in self.options.items():
-                matched, modified_argument = option.matches(modified_argument)
+    def _get_matches(self, argument):
+        index = self.dispatch_index
+        # names take precedence over clusters, e.g. -foo over -f -o -o
+        if argument not in index.matches:
+            cluster = index.decode_cluster(argument)
+            if cluster is not None:
+                return cluster
+        matches = []
+        while True:
+            match = self._get_match(argument)
+            if match is None:
+                return None
+            name, match, modified = match
+            matches.append((name, match))
+            if not modified or modified == argument:
+                return matches
+            argument = modified
+
+    def get_matches(self, argument):
+        """
+        Returns a list of ``(name, match)`` tuples for the option or command
+        `argument` matches or, if `argument` is a cluster of abbreviated
+        option names such as ``-abc``, for each of the options in the order
+        in which they have to be parsed.
+
+        Raises :exc:`UnexpectedArgument` if `argument` does not match.
+        """
+        matches = self._get_matches(argument)
+        if matches is None:
+            raise UnexpectedArgument(u("{0!r} is unexpected").format(argument))
+        return matches
+
+    def _get_match(self, argument):
+        index = self.dispatch_index
+        match = index.matches.get(argument)
+        if match is not None:
+            name, match, modified = match
+            if isinstance(match, LazyCommand):
+                match = self.load_command(name)
+            return name, match, modified
+        # a bare prefix such as "--" is not an abbreviation
+        if (index.long_prefixes is not None and
+            argument.lstrip("".join(Option.prefix_chars))):
+            longs = index.long_prefixes.lookup(argument)
+            if len(longs) == 1:
+                option = index.long_prefixes[longs[0]]
+                return self.options[option], option, ""
+            elif longs:
+                raise AmbiguousArgument(
+                    u("{0!r} is ambiguous, it could be {1}").format(
+                        argument, u(", ").join(longs)
+                    )
+                )
+        if index.custom_options:
+            for option in index.scan_order:
+                matched, modified = option.matches(argument)
                 if matched:
-                    return name, option, modified_argument
-        raise UnexpectedArgument(u("{0!r} is unexpected").format(argument))
+                    if self.adaptive_matching and not self.frozen:
+                        self._count_match(index, option)
+                    return self.options[option], option, modified
+            return None
+        # without custom options only the option with the abbreviated name
+        # the argument starts with can match, e.g. -n for -n1
+        match = index.short_characters.get(argument[:1], {}).get(
+            argument[1:2]
+        )
+        if match is not None:
+            name, option = match
+            matched, modified = option.matches(argument)
+            if matched:
+                return name, option, modified
+        return None
+
+    def _count_match(self, index, option):
+        # counts are not synchronized, concurrent parsing may lose some
+        counts = self._match_counts
+        counts[option] = counts.get(option, 0) + 1
+        index.scanned += 1
+        if index.scanned >= self.adaptive_matching_interval:
+            index.scan_order = self._get_scan_order()
+            index.scanned = 0
+
+    def _get_scan_order(self):
+        if not self.adaptive_matching:
+            return list(self.options)
+        counts = self._match_counts
+        # sorting is stable, options matched equally often remain in the
+        # order in which they have been added
+        return sorted(
+            self.options, key=lambda option: -counts.get(option, 0)
+        )
 
-    def run(self, arguments, default_args=None, default_kwargs=None,
-            passthrough_errors=False):
-        if not isinstance(arguments, Arguments):
-            arguments = Arguments(arguments)
-        expected_positionals = iter(self.positionals)
-        args = [] if default_args is None else default_args
-        kwargs = {}
-        if default_kwargs:
-            kwargs.update(default_kwargs)
+    @property
+    def match_counts(self):
+        """
+        A mapping of option names to the number of times the options have
+        been matched by trying them, if :attr:`adaptive_matching` is
+        ``True``. Options are named by their complete name or, if they have
+        none, their abbreviated name.
+
+        The counts can be persisted and restored in another process with
+        :meth:`set_match_counts`, see also
+        :func:`awwparse.cache.dump_match_counts`.
+        """
+        return dict(
+            (_get_option_name(option), count)
+            for option, count in self._match_counts.items()
+        )
+
+    def set_match_counts(self, counts):
+        """
+        Sets the :attr:`match_counts` of the options named in the given
+        `counts` mapping and adapts the order in which options are tried.
+        Names of options this command does not have are ignored.
+
+        Raises a :exc:`TypeError` if the command is frozen.
+        """
+        self._ensure_not_frozen()
+        options = dict(
+            (_get_option_name(option), option) for option in self.options
+        )
+        for name, count in counts.items():
+            if name in options:
+                self._match_counts[options[name]] = count
+        self._invalidate_dispatch_index()
+
+    def get_match(self, argument):
+        """
+        Returns a ``(name, match, modified)`` tuple for the option or command
+        `argument` matches, `modified` is the part of `argument` that remains
+        to be matched in case of a cluster of abbreviated option names.
+
+        Raises :exc:`UnexpectedArgument` if `argument` does not match.
+        """
+        match = self._get_match(argument)
+        if match is None:
+            raise UnexpectedArgument(u("{0!r} is unexpected").format(argument))
+        return match
+
+    def create_arguments(self, arguments):
+        """
+        Returns an :class:`Arguments` object for the given `arguments`.
+        """
+        if isinstance(arguments, Arguments):
+            return arguments
+        if self.trace_size is not None:
+            return BoundedArguments(arguments, trace_size=self.trace_size)
+        return Arguments(arguments)
+
+    def get_namespace_class(self, fields=()):
+        """
+        Returns a :class:`~awwparse.namespaces.Namespace` subclass with the
+        given `fields` followed by the identifiers of the options of this
+        command.
+        """
+        fields = tuple(fields)
+        cls = self._namespace_classes.get(fields)
+        if cls is None:
+            known = set(fields)
+            cls = self._namespace_classes[fields] = create_namespace_class(
+                fields + tuple(
+                    identifier for option, identifier in self.options.items()
+                    if identifier not in known and
+                    not isinstance(option, HelpOption)
+                )
+            )
+        return cls
+
+    def create_namespace(self, default_kwargs=None):
+        """
+        Returns the object the values of options are collected in by
+        :meth:`parse` and :meth:`run`, initialized with `default_kwargs`.
+
+        This is a dictionary unless :attr:`use_namespaces` is ``True``.
+        """
+        if not self.use_namespaces:
+            return {} if default_kwargs is None else dict(default_kwargs)
+        if default_kwargs is None:
+            return self.get_namespace_class()()
+        return self.get_namespace_class(tuple(default_kwargs))(default_kwargs)
+
+    def _adapt_namespace(self, namespace):
+        # namespaces are created for the command parsing begins with, once a
+        # subcommand is dispatched to, its options have to be added
+        if not isinstance(namespace, Namespace):
+            return namespace
+        cls = self.get_namespace_class(namespace.fields)
+        if cls is namespace.__class__:
+            return namespace
+        return cls(namespace)
+
+    def _parse(self, arguments, args, kwargs, passthrough_errors=False,
+               report_help=False):
+        # subcommands are dispatched to by walking down the tree in this
+        # loop, so that the depth of the tree does not affect the stack
+        command = self
+        command_path = []
+        arguments.passthrough_errors = passthrough_errors
+        arguments.report_help = report_help
         try:
-            for argument in arguments:
-                previous_modified = argument
-                try:
-                    name, match, modified = self.get_match(argument)
-                except UnexpectedArgument:
-                    exc_info = sys.exc_info()
-                    try:
-                        positional = next(expected_positionals)
-                    except StopIteration:
-                        six.reraise(*exc_info)
-                    else:
-                        arguments.rewind()
-                        args = positional.parse_as_positional(
-                            self, args, arguments
-                        )
-                else:
-                    while modified != previous_modified:
-                        if hasattr(match, "run"):
-                            arguments.trace.append([])
-                            match.run(arguments, args, kwargs)
-                            return
-                        kwargs = match.parse(self, kwargs, name, arguments)
-                        previous_modified = modified
-                        if not modified:
-                            break
-                        name, option, modified = self.get_match(modified)
-            try:
-                positional = next(expected_positionals)
-            except StopIteration:
-                pass
-            else:
-                if not positional.optional:
-                    raise PositionalArgumentMissing(
-                        u("expected {positional.metavar}").format(
-                            positional=positional
-                        )
-                    )
+            while True:
+                name, subcommand, args, kwargs = command._parse_own_arguments(
+                    arguments, args, kwargs
+                )
+                if subcommand is None:
+                    break
+                command_path.append(name)
+                command = subcommand
+                kwargs = command._adapt_namespace(kwargs)
         except CLIError:
             if passthrough_errors:
                 raise
-            self.handle_error(sys.exc_info(), arguments)
+            command.handle_error(sys.exc_info(), arguments)
             assert False, "exit should have aborted execution"
-        return self.main(*args, **kwargs)
+        return tuple(command_path), command, args, kwargs
+
+    def _parse_own_arguments(self, arguments, args, kwargs):
+        # parses the arguments up to a subcommand, returns a tuple
+        # ``(name, subcommand, args, kwargs)`` with `name` and `subcommand`
+        # being `None` if there is no subcommand
+        expected_positionals = iter(self.positionals)
+        for argument in arguments:
+            matches = self._get_matches(argument)
+            if matches is None:
+                positional = next(expected_positionals, None)
+                if positional is None:
+                    raise UnexpectedArgument(
+                        u("{0!r} is unexpected").format(argument)
+                    )
+                arguments.rewind()
+                args = positional.parse_as_positional(self, args, arguments)
+                if positional.remaining:
+                    # the remaining arguments belong to the positional,
+                    # which may not have consumed them yet
+                    break
+            else:
+                name, match = matches[0]
+                if hasattr(match, "run"):
+                    arguments.begin_frame()
+                    return name, match, args, kwargs
+                for name, option in matches:
+                    kwargs = option.parse(self, kwargs, name, arguments)
+                if option.remaining:
+                    break
+        positional = next(expected_positionals, None)
+        if positional is not None and not positional.optional:
+            raise PositionalArgumentMissing(
+                u("expected {positional.metavar}").format(
+                    positional=positional
+                )
+            )
+        return None, None, args, kwargs
+
+    def _parse_arguments(self, arguments, default_args, default_kwargs,
+                         passthrough_errors, report_help=False):
+        # with response files the arguments do not determine the result, as
+        # the files may change
+        if (self.parse_cache is not None and default_args is None and
+            not default_kwargs and isinstance(arguments, (list, tuple)) and
+            getattr(self, "response_files", None) is None):
+            return self._parse_cached(
+                tuple(arguments), passthrough_errors, report_help
+            )
+        args = [] if default_args is None else list(default_args)
+        return self._parse(
+            self.create_arguments(arguments), args,
+            self.create_namespace(default_kwargs), passthrough_errors,
+            report_help
+        )
+
+    def _parse_cached(self, arguments, passthrough_errors, report_help=False):
+        cached = self.parse_cache.get(arguments)
+        if cached is None:
+            result = self._parse(
+                self.create_arguments(arguments), [], self.create_namespace(),
+                passthrough_errors, report_help
+            )
+            command_path, command, args, kwargs = result
+            if self._is_cacheable(command_path, kwargs):
+                self.parse_cache[arguments] = (
+                    command_path, command, deepcopy(args), deepcopy(kwargs)
+                )
+            return result
+        command_path, command, args, kwargs = cached
+        return command_path, command, deepcopy(args), deepcopy(kwargs)
+
+    def _is_cacheable(self, command_path, kwargs):
+        commands = [self]
+        for name in command_path:
+            commands.append(commands[-1].commands[name])
+        for command in commands:
+            for positional in command.positionals:
+                if not positional.cacheable or positional.stream:
+                    return False
+            for option, identifier in command.options.items():
+                if identifier not in kwargs:
+                    continue
+                for positional in option.positionals:
+                    if not positional.cacheable or positional.stream:
+                        return False
+        return True
+
+    def parse(self, arguments, default_args=None, default_kwargs=None,
+              passthrough_errors=False):
+        """
+        Parses the given `arguments` like :meth:`run` but instead of invoking
+        :meth:`main` returns a tuple ``(command_path, args, kwargs)``.
+        `command_path` is a tuple of the names of the commands that have been
+        dispatched to, starting below this command.
+        """
+        command_path, _, args, kwargs = self._parse_arguments(
+            arguments, default_args, default_kwargs, passthrough_errors
+        )
+        return command_path, args, kwargs
+
+    def parse_many(self, argument_vectors, default_args=None,
+                   default_kwargs=None):
+        """
+        Parses each of the given `argument_vectors` like :meth:`parse` and
+        returns a list with a ``(command_path, args, kwargs)`` tuple for each
+        of them.
+
+        Errors are neither printed nor do they abort parsing, instead the
+        :exc:`~awwparse.exceptions.CLIError` raised for an argument vector
+        takes the place of its result. This includes requesting help, which
+        results in a :exc:`~awwparse.exceptions.HelpRequested` error instead
+        of printing help and exiting.
+        """
+        results = []
+        for arguments in argument_vectors:
+            try:
+                command_path, _, args, kwargs = self._parse_arguments(
+                    arguments, default_args, default_kwargs,
+                    passthrough_errors=True, report_help=True
+                )
+            except CLIError as error:
+                results.append(error)
+            else:
+                results.append((command_path, args, kwargs))
+        return results
+
+    def run(self, arguments, default_args=None, default_kwargs=None,
+            passthrough_errors=False):
+        _, command, args, kwargs = self._parse_arguments(
+            arguments, default_args, default_kwargs, passthrough_errors
+        )
+        return command.main(*args, **kwargs)
+
+    def create_parser_state(self, default_args=None, default_kwargs=None):
+        """
+        Returns a :class:`~awwparse.incremental.ParserState`, which parses
+        arguments for this command as they are fed one at a time.
+        """
+        from awwparse.incremental import ParserState
+        return ParserState(self, default_args, default_kwargs)
+
+    def compile(self):
+        """
+        Returns a :class:`~awwparse.compiler.CompiledParser`, which parses
+        arguments like :meth:`parse` and :meth:`run` using code generated for
+        this command and its subcommands.
+
+        The command should be complete before it is compiled, changes made
+        afterwards are not reflected by the compiled parser.
+        """
+        from awwparse.compiler import compile_command
+        return compile_command(self)
 
     def handle_error(self, exc_info, arguments=None):
         exc_type, exc_value, traceback = exc_info
@@ -661,6 +1754,8 @@ class Option(object):
     :param help: A help message explaining the option in detail
                  (default: ``None``).
     """
+    __slots__ = ("short", "long", "positionals", "action", "help", "_derived")
+
     prefix_chars = frozenset(["-", "+"])
 
     def __init__(self, *signature, **kwargs):
@@ -672,6 +1767,7 @@ class Option(object):
         self.short = short
         self.long = long
         self.positionals = positionals
+        self._derived = None
         set_attributes_from_kwargs(self, kwargs, {
             "action": store_last,
             "help": None
@@ -714,20 +1810,62 @@ class Option(object):
     def setdefault_metavars(self, metavar):
         if isinstance(metavar, six.binary_type):
             metavar = metavar.decode("utf-8")
-        for positional in self.positionals:
-            positional.setdefault_metavar(metavar)
+        for i, positional in enumerate(self.positionals):
+            if positional.metavar is None:
+                # positionals may be shared with other options, so we have to
+                # copy them before changing them
+                positional = copy(positional)
+                positional.setdefault_metavar(metavar)
+                self.positionals[i] = positional
+
+    def with_default_metavars(self, metavar):
+        """
+        Returns a copy of the option with `metavar` as metavar of all
+        positionals that do not have one.
+
+        Positionals with a metavar are shared with the copy. The others are
+        copied once for each `metavar` and these copies are reused by later
+        calls, as long as the positional they have been copied from has not
+        been changed, so that an option added to many commands under the
+        same identifier shares its positionals between all of them.
+        """
+        if isinstance(metavar, six.binary_type):
+            metavar = metavar.decode("utf-8")
+        option = self.copy()
+        for i, positional in enumerate(option.positionals):
+            if positional.metavar is None:
+                option.positionals[i] = self._derive_positional(
+                    positional, metavar
+                )
+        return option
+
+    def _derive_positional(self, positional, metavar):
+        if self._derived is None:
+            self._derived = {}
+        # the positional is kept in the entry, so its id cannot be reused
+        key = id(positional), metavar
+        state = positional.copy_args()
+        derived = self._derived.get(key)
+        if derived is None or derived[1] != state:
+            copied = copy(positional)
+            copied.setdefault_metavar(metavar)
+            derived = self._derived[key] = positional, state, copied
+        return derived[2]
 
     def copy(self):
+        """
+        Returns a copy of the option, that shares the positionals with this
+        one until they are changed with :meth:`setdefault_metavars`.
+        """
+        # commands copy every option they are created with, so the
+        # attributes are assigned directly
         option = self.__class__.__new__(self.__class__)
-        set_attributes(option, {
-            "short": self.short,
-            "long": self.long,
-            "positionals": [
-                positional.copy() for positional in self.positionals
-            ],
-            "action": self.action,
-            "help": self.help
-        })
+        option.short = self.short
+        option.long = self.long
+        option.positionals = list(self.positionals)
+        option.action = self.action
+        option.help = self.help
+        option._derived = None
         return option
 
     def get_usage(self, using="short"):
@@ -787,6 +1925,13 @@ class Option(object):
             usage=render(reduce(step, self.positionals, ([], ) * 2)[0])
         ).strip()
 
+    @property
+    def remaining(self):
+        """
+        ``True`` if the option takes all remaining arguments.
+        """
+        return any(positional.remaining for positional in self.positionals)
+
     def get_prefix(self, argument):
         return "".join(takewhile(lambda c: c in self.prefix_chars, argument))
 
@@ -795,7 +1940,7 @@ class Option(object):
             return True, ""
         elif self.short is not None and argument.startswith(self.short):
             prefix = self.get_prefix(self.short)
-            stripped = argument.lstrip(self.short)
+            stripped = argument[len(self.short):]
             modified = prefix + stripped if stripped else ""
             return True, modified
         return False, argument
@@ -804,9 +1949,13 @@ class Option(object):
         result = []
         for positional in self.positionals:
             try:
-                result.append(positional.parse(command, arguments))
+                parsed = positional.parse(command, arguments)
             except EndOptionParsing:
+                # raised by positionals predating missing
+                break
+            if parsed is missing:
                 break
+            result.append(parsed)
         result = result if len(self.positionals) > 1 else result[0]
         namespace[name] = self.action(namespace.get(name), result)
         return namespace
@@ -821,6 +1970,8 @@ class Option(object):
 
 
 class HelpOption(Option):
+    __slots__ = ()
+
     def __init__(self):
         Option.__init__(
             self,
@@ -847,6 +1998,8 @@ class HelpOption(Option):
             return u("{0}, {1}").format(self.short, self.long)
 
     def parse(self, command, namespace, name, arguments):
+        if arguments.report_help:
+            raise HelpRequested(u("help requested"), command, arguments)
         command.print_help(arguments)
         command.exit()
 
@@ -858,6 +2011,10 @@ class CLI(Command):
     """
     Represents the command line interface of an application. Inherits from
     :class:`Command`.
+
+    Arguments of the form ``@path`` are expanded if a :class:`ResponseFiles`
+    object is passed as `response_files`. If `trace_size` is given it
+    overrides :attr:`Command.trace_size`.
     """
     #: The number of spaces used for indentation of sections in the help
     #: message (default: 2).
@@ -866,11 +2023,14 @@ class CLI(Command):
     def __init__(self, options=None, commands=None, positionals=None,
                  application_name=sys.argv[0], usage=None, stdin=sys.stdin,
                  stdout=sys.stdout, stderr=sys.stderr, exit=sys.exit,
-                 width=None):
+                 width=None, response_files=None, trace_size=None):
         Command.__init__(
             self, options=options, commands=commands, positionals=positionals
         )
         self.application_name = application_name
+        self.response_files = response_files
+        if trace_size is not None:
+            self.trace_size = trace_size
         self.usage = usage
         self.stdin = stdin
         self.stdout = stdout
@@ -878,6 +2038,24 @@ class CLI(Command):
         self.exit = exit
         self.width = width if width is not None else get_terminal_width()
 
+    def __getstate__(self):
+        state = Command.__getstate__(self)
+        # standard streams cannot be pickled, they are replaced with the ones
+        # of the unpickling process
+        for name in ["stdin", "stdout", "stderr"]:
+            standard_streams = [
+                getattr(sys, name), getattr(sys, "__{0}__".format(name))
+            ]
+            if any(state[name] is stream for stream in standard_streams):
+                state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in ["stdin", "stdout", "stderr"]:
+            if state[name] is None:
+                setattr(self, name, getattr(sys, name))
+
     def get_usage(self, arguments=None):
         if self.usage is None:
             return u("{0} {1}").format(
@@ -886,6 +2064,18 @@ class CLI(Command):
             )
         return self.usage
 
+    def create_arguments(self, arguments):
+        if isinstance(arguments, Arguments):
+            return arguments
+        if self.trace_size is not None:
+            return BoundedArguments(
+                arguments, self.application_name, self.response_files,
+                self.trace_size
+            )
+        return Arguments(
+            arguments, self.application_name, self.response_files
+        )
+
     def run(self, arguments=sys.argv[1:], passthrough_errors=False):
         """run(self, arguments=sys.argv[1:], passthrough_errors=False)
 
@@ -895,7 +2085,6 @@ class CLI(Command):
         If `passthrough_errors` (default: ``False``) is ``True``
         :exc:`CLIError`\s will not be caught.
         """
-        arguments = Arguments(arguments, self.application_name)
         return Command.run(
             self, arguments, passthrough_errors=passthrough_errors
         )
@@ -905,8 +2094,6 @@ __all__ = [
     "CLI", "Command", "Option", "Positional", "String", "Bytes", "Integer",
     "Float", "Complex", "Decimal", "Any", "Number", "Choice", "Boolean",
     "NativeString", "Mapping", "store_last", "append_to_list", "add_to_set",
-    "add", "sub", "File", "Resource", "LocalResource"
+    "add", "sub", "File", "Resource", "LocalResource", "LazyCommand",
+    "ResponseFiles"
 ]
-# This should probably be a test, even though I think Python should raise an
-# exception if __all__ is ill-defined, instead of ignoring it.
-ensure_all(__all__)
@@ -0,0 +1,231 @@
+# coding: utf-8
+"""
+    awwparse.cache
+    ~~~~~~~~~~~~~~
+
+    Caches fully built command trees on disk, so that applications with large
+    command line interfaces do not have to build them on every start.
+    Furthermore the :attr:`~awwparse.Command.match_counts` learned by
+    commands can be kept across processes.
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import sys
+import json
+import hashlib
+import tempfile
+from types import FunctionType, MethodType
+
+from six.moves import cPickle as pickle
+
+
+#: Incremented whenever the format of cache files changes.
+CACHE_FORMAT_VERSION = 1
+
+
+def _iter_attributes(object):
+    try:
+        attributes = vars(object)
+    except TypeError:
+        pass
+    else:
+        for value in attributes.values():
+            yield value
+    for class_ in type(object).__mro__:
+        for name in class_.__dict__.get("__slots__", ()):
+            try:
+                yield getattr(object, name)
+            except AttributeError:
+                pass
+
+
+def _iter_modules(command):
+    seen = set()
+    stack = [command]
+    while stack:
+        object = stack.pop()
+        if id(object) in seen:
+            continue
+        seen.add(id(object))
+        if isinstance(object, (list, tuple, set, frozenset)):
+            yield type(object).__module__
+            stack.extend(object)
+        elif isinstance(object, dict):
+            yield type(object).__module__
+            stack.extend(object.keys())
+            stack.extend(object.values())
+        elif isinstance(object, (FunctionType, type)):
+            yield object.__module__
+        elif isinstance(object, MethodType):
+            stack.append(object.__func__)
+        elif hasattr(object, "func") and hasattr(object, "args"):
+            # functools.partial
+            stack.append(object.func)
+            stack.extend(object.args)
+        elif not isinstance(object, (str, bytes, int, float, complex)):
+            yield type(object).__module__
+            stack.extend(_iter_attributes(object))
+
+
+def _get_file_key(path, use_hashes):
+    if use_hashes:
+        with open(path, "rb") as file:
+            return hashlib.sha1(file.read()).hexdigest()
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def get_dependencies(command):
+    """
+    Returns a sorted list of the source files of the modules defining the
+    classes and functions `command` has been built from.
+    """
+    paths = set()
+    for module_name in set(_iter_modules(command)):
+        path = _get_module_path(module_name)
+        if path is not None:
+            paths.add(path)
+    return sorted(paths)
+
+
+def _get_module_path(module_name):
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if path is None:
+        return None
+    if path.endswith((".pyc", ".pyo")):
+        path = path[:-1]
+    return os.path.abspath(path)
+
+
+def _get_key(factory, dependencies, use_hashes):
+    return (
+        CACHE_FORMAT_VERSION,
+        tuple(sys.version_info[:3]),
+        getattr(factory, "__module__", None),
+        getattr(factory, "__name__", None),
+        tuple(
+            (path, _get_file_key(path, use_hashes)) for path in dependencies
+        )
+    )
+
+
+def _load(factory, path, use_hashes):
+    with open(path, "rb") as file:
+        format_version, dependencies = pickle.load(file)
+        if format_version != CACHE_FORMAT_VERSION:
+            return None
+        key = pickle.load(file)
+        if key != _get_key(factory, dependencies, use_hashes):
+            return None
+        return pickle.load(file)
+
+
+def _dump(factory, path, command, dependencies, use_hashes):
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(
+                (CACHE_FORMAT_VERSION, dependencies),
+                file,
+                pickle.HIGHEST_PROTOCOL
+            )
+            pickle.dump(
+                _get_key(factory, dependencies, use_hashes),
+                file,
+                pickle.HIGHEST_PROTOCOL
+            )
+            pickle.dump(command, file, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary_path, path)
+    except:
+        os.remove(temporary_path)
+        raise
+
+
+def load_command(factory, path, dependencies=(), use_hashes=False):
+    """
+    Returns the command built by calling `factory` without arguments and
+    caches it in the file at `path`.
+
+    On subsequent calls the command is loaded from the cache, unless any of
+    the source files of the modules it has been built from, the source file
+    of the module defining `factory` or any of the additional `dependencies`
+    (paths of files) has changed in the meantime, in which case the command
+    is rebuilt and the cache is replaced.
+
+    Changes are detected using modification times and file sizes or, if
+    `use_hashes` is ``True``, hashes of the file contents.
+
+    If the cache cannot be read or written or the command cannot be pickled,
+    the command is built as if there were no cache.
+    """
+    try:
+        command = _load(factory, path, use_hashes)
+    except Exception:
+        command = None
+    if command is not None:
+        return command
+    command = factory()
+    try:
+        paths = set(get_dependencies(command))
+        paths.update(map(os.path.abspath, dependencies))
+        factory_path = _get_module_path(getattr(factory, "__module__", None))
+        if factory_path is not None:
+            paths.add(factory_path)
+        _dump(factory, path, command, sorted(paths), use_hashes)
+    except Exception:
+        pass
+    return command
+
+
+def _write_atomically(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.rename(temporary_path, path)
+    except:
+        os.remove(temporary_path)
+        raise
+
+
+def dump_match_counts(command, path):
+    """
+    Writes the :attr:`~awwparse.Command.match_counts` of `command` and all
+    loaded commands below it to the file at `path`.
+    """
+    counts = [
+        [list(command_path), subcommand.match_counts]
+        for command_path, subcommand in sorted(command.command_paths.items())
+        if hasattr(subcommand, "match_counts") and subcommand.match_counts
+    ]
+    _write_atomically(path, json.dumps(counts).encode("utf-8"))
+
+
+def load_match_counts(command, path):
+    """
+    Sets the :attr:`~awwparse.Command.match_counts` of `command` and the
+    commands below it to those written to the file at `path` by
+    :func:`dump_match_counts`, so that options are tried in the order learned
+    by a previous process.
+
+    Counts of commands that no longer exist or have not been loaded yet are
+    ignored. Returns ``False`` if the file cannot be read, in which case
+    the counts remain unchanged, otherwise ``True``. As the counts of frozen
+    commands cannot be changed, this has to be called before
+    :meth:`~awwparse.Command.freeze`.
+    """
+    try:
+        with open(path, "rb") as file:
+            counts = json.loads(file.read().decode("utf-8"))
+    except (IOError, OSError, ValueError):
+        return False
+    command_paths = command.command_paths
+    for command_path, command_counts in counts:
+        subcommand = command_paths.get(tuple(command_path))
+        if hasattr(subcommand, "set_match_counts"):
+            subcommand.set_match_counts(command_counts)
+    return True
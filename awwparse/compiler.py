@@ -0,0 +1,361 @@
+# coding: utf-8
+"""
+    awwparse.compiler
+    ~~~~~~~~~~~~~~~~~
+
+    Generates Python code specialized to parse the arguments of a given
+    command tree.
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import sys
+
+import six
+from six import u
+
+from awwparse import Command, Option, LazyCommand
+from awwparse.actions import store_last
+from awwparse.exceptions import (
+    CLIError, UnexpectedArgument, PositionalArgumentMissing
+)
+
+
+#: The module positionals whose :meth:`~awwparse.positionals.Positional.parse`
+#: can be called directly, if they are not optional, because they neither
+#: return :data:`~awwparse.utils.missing` nor raise
+#: :exc:`~awwparse.exceptions.EndOptionParsing`.
+INLINABLE_POSITIONALS_MODULE = "awwparse.positionals"
+
+
+class CodeWriter(object):
+    """
+    Collects lines of source code and keeps track of their indentation.
+    """
+    def __init__(self, indentation="    "):
+        self.indentation = indentation
+        self.level = 0
+        self.lines = []
+
+    def line(self, line=""):
+        self.lines.append(self.indentation * self.level + line if line else "")
+
+    def indent(self):
+        self.level += 1
+
+    def dedent(self):
+        self.level -= 1
+
+    def get_source(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class CompiledParser(object):
+    """
+    Parses arguments for a `command` tree like :meth:`Command.parse` and
+    :meth:`Command.run`, using code generated for that tree.
+
+    The generated code reflects the tree at the time it was compiled, options,
+    commands or positionals added later on are not taken into account.
+    Commands which are not part of the compiled tree, such as
+    :class:`~awwparse.LazyCommand`\s loaded while parsing, are parsed by
+    :meth:`Command.parse`.
+    """
+    def __init__(self, command, source, namespace):
+        #: The command that has been compiled.
+        self.command = command
+        #: The generated source code.
+        self.source = source
+        code = compile(source, "<awwparse compiled {0}>".format(
+            command.__class__.__name__
+        ), "exec")
+        six.exec_(code, namespace)
+        self._parse = namespace["parse"]
+
+    def _parse_arguments(self, arguments, default_args, default_kwargs,
+                         passthrough_errors):
+        args = [] if default_args is None else list(default_args)
+        return self._parse(
+            self.command.create_arguments(arguments), args,
+            self.command.create_namespace(default_kwargs), passthrough_errors
+        )
+
+    def parse(self, arguments, default_args=None, default_kwargs=None,
+              passthrough_errors=False):
+        """
+        Parses the given `arguments` like :meth:`Command.parse`.
+        """
+        command_path, _, args, kwargs = self._parse_arguments(
+            arguments, default_args, default_kwargs, passthrough_errors
+        )
+        return command_path, args, kwargs
+
+    def run(self, arguments, default_args=None, default_kwargs=None,
+            passthrough_errors=False):
+        """
+        Parses the given `arguments` and invokes the `main` method of the
+        command dispatched to like :meth:`Command.run`.
+        """
+        _, command, args, kwargs = self._parse_arguments(
+            arguments, default_args, default_kwargs, passthrough_errors
+        )
+        return command.main(*args, **kwargs)
+
+    def __repr__(self):
+        return "<{0} for {1!r}>".format(self.__class__.__name__, self.command)
+
+
+def _is_inlinable(option):
+    if (six.get_unbound_function(option.__class__.parse) is not
+        six.get_unbound_function(Option.parse)):
+        return False
+    return all(
+        not positional.optional and
+        positional.__class__.__module__ == INLINABLE_POSITIONALS_MODULE
+        for positional in option.positionals
+    )
+
+
+def _collect_commands(command):
+    commands = [command]
+    seen = set([id(command)])
+    for command in commands:
+        for subcommand in command.commands.values():
+            if isinstance(subcommand, LazyCommand):
+                continue
+            if id(subcommand) not in seen:
+                seen.add(id(subcommand))
+                commands.append(subcommand)
+    return commands
+
+
+class _Compiler(object):
+    def __init__(self, command):
+        self.command = command
+        self.commands = _collect_commands(command)
+        self.namespace = {
+            "sys": sys,
+            "u": u,
+            "CLIError": CLIError,
+            "UnexpectedArgument": UnexpectedArgument,
+            "PositionalArgumentMissing": PositionalArgumentMissing
+        }
+        self.writer = CodeWriter()
+
+    def compile(self):
+        for node, command in enumerate(self.commands):
+            self.write_node(node, command)
+        self.write_driver()
+        return CompiledParser(
+            self.command, self.writer.get_source(), self.namespace
+        )
+
+    def get_codes(self, command):
+        # assigns a code to each option and subcommand matched by name,
+        # returns the token table and a list of ``(name, match)`` tuples
+        index = command.dispatch_index
+        table = {}
+        matches = []
+        codes = {}
+        for argument, (name, match, _) in index.matches.items():
+            if isinstance(match, LazyCommand):
+                continue
+            if id(match) not in codes:
+                codes[id(match)] = len(matches)
+                matches.append((name, match))
+            table[argument] = codes[id(match)]
+        return table, matches
+
+    def write_node(self, node, command):
+        table, matches = self.get_codes(command)
+        positionals = tuple(command.positionals)
+        self.namespace.update({
+            "c{0}".format(node): command,
+            "t{0}".format(node): table,
+            "s{0}".format(node): positionals
+        })
+        w = self.writer
+        w.line("def parse_{0}(arguments, args, kwargs):".format(node))
+        w.indent()
+        w.line("position = 0")
+        w.line("for argument in arguments:")
+        w.indent()
+        w.line("code = t{0}.get(argument)".format(node))
+        w.line("if code is None:")
+        w.indent()
+        self.write_generic_match(node, len(positionals))
+        w.dedent()
+        if matches:
+            w.line("else:")
+            w.indent()
+            self.write_dispatch(node, matches, 0, len(matches))
+            w.dedent()
+        w.dedent()
+        if positionals:
+            w.line(
+                "if position < {0} and not s{1}[position].optional:".format(
+                    len(positionals), node
+                )
+            )
+            w.indent()
+            w.line("raise PositionalArgumentMissing(")
+            w.line("    u('expected {positional.metavar}').format(")
+            w.line("        positional=s{0}[position]".format(node))
+            w.line("    )")
+            w.line(")")
+            w.dedent()
+        w.line("return None, None, args, kwargs")
+        w.dedent()
+        w.line()
+
+    def write_generic_match(self, node, positional_count):
+        # mirrors Command._parse_own_arguments for arguments that are not in
+        # the token table
+        w = self.writer
+        w.line("matches = c{0}._get_matches(argument)".format(node))
+        w.line("if matches is None:")
+        w.indent()
+        if positional_count:
+            w.line("if position == {0}:".format(positional_count))
+            w.indent()
+        w.line(
+            "raise UnexpectedArgument(u('{0!r} is unexpected')"
+            ".format(argument))"
+        )
+        if positional_count:
+            w.dedent()
+            w.line("positional = s{0}[position]".format(node))
+            w.line("position += 1")
+            w.line("arguments.rewind()")
+            w.line(
+                "args = positional.parse_as_positional(c{0}, args, arguments)"
+                .format(node)
+            )
+            w.line("if positional.remaining:")
+            w.line("    break")
+        w.dedent()
+        w.line("else:")
+        w.indent()
+        w.line("name, match = matches[0]")
+        w.line("if hasattr(match, 'run'):")
+        w.indent()
+        w.line("arguments.begin_frame()")
+        w.line("return name, match, args, kwargs")
+        w.dedent()
+        w.line("for name, option in matches:")
+        w.line(
+            "    kwargs = option.parse(c{0}, kwargs, name, arguments)"
+            .format(node)
+        )
+        w.line("if option.remaining:")
+        w.line("    break")
+        w.dedent()
+
+    def write_dispatch(self, node, matches, start, stop):
+        # dispatches on the codes in [start, stop) by bisection, so that the
+        # number of comparisons grows logarithmically with the number of
+        # options and commands
+        w = self.writer
+        if stop - start == 1:
+            self.write_match(node, start, *matches[start])
+            return
+        middle = (start + stop) // 2
+        w.line("if code < {0}:".format(middle))
+        w.indent()
+        self.write_dispatch(node, matches, start, middle)
+        w.dedent()
+        w.line("else:")
+        w.indent()
+        self.write_dispatch(node, matches, middle, stop)
+        w.dedent()
+
+    def write_match(self, node, code, name, match):
+        w = self.writer
+        suffix = "{0}_{1}".format(node, code)
+        self.namespace["n" + suffix] = name
+        if isinstance(match, Command):
+            self.namespace["x" + suffix] = match
+            w.line("arguments.begin_frame()")
+            w.line("return n{0}, x{0}, args, kwargs".format(suffix))
+            return
+        if _is_inlinable(match):
+            results = []
+            for i, positional in enumerate(match.positionals):
+                self.namespace["p{0}_{1}".format(suffix, i)] = positional
+                results.append(
+                    "p{0}_{1}.parse(c{2}, arguments)".format(suffix, i, node)
+                )
+            if len(results) == 1:
+                result = results[0]
+            else:
+                result = "[{0}]".format(", ".join(results))
+            if match.action is store_last:
+                w.line("kwargs[n{0}] = {1}".format(suffix, result))
+            else:
+                self.namespace["a" + suffix] = match.action
+                w.line("kwargs[n{0}] = a{0}(kwargs.get(n{0}), {1})".format(
+                    suffix, result
+                ))
+        else:
+            self.namespace["o" + suffix] = match
+            w.line(
+                "kwargs = o{0}.parse(c{1}, kwargs, n{0}, arguments)".format(
+                    suffix, node
+                )
+            )
+        if match.remaining:
+            w.line("break")
+
+    def write_driver(self):
+        self.namespace["parsers"] = {}
+        w = self.writer
+        for node, command in enumerate(self.commands):
+            w.line("parsers[id(c{0})] = parse_{0}".format(node))
+        w.line()
+        w.line()
+        w.line("def parse(arguments, args, kwargs, passthrough_errors):")
+        w.indent()
+        w.line("command = c0")
+        w.line("command_path = []")
+        w.line("arguments.passthrough_errors = passthrough_errors")
+        w.line("try:")
+        w.indent()
+        w.line("while True:")
+        w.indent()
+        w.line("parse_arguments = parsers.get(id(command))")
+        w.line("if parse_arguments is None:")
+        w.indent()
+        w.line("name, subcommand, args, kwargs = (")
+        w.line("    command._parse_own_arguments(arguments, args, kwargs)")
+        w.line(")")
+        w.dedent()
+        w.line("else:")
+        w.indent()
+        w.line("name, subcommand, args, kwargs = parse_arguments(")
+        w.line("    arguments, args, kwargs")
+        w.line(")")
+        w.dedent()
+        w.line("if subcommand is None:")
+        w.line("    break")
+        w.line("command_path.append(name)")
+        w.line("command = subcommand")
+        w.line("kwargs = command._adapt_namespace(kwargs)")
+        w.dedent()
+        w.dedent()
+        w.line("except CLIError:")
+        w.indent()
+        w.line("if passthrough_errors:")
+        w.line("    raise")
+        w.line("command.handle_error(sys.exc_info(), arguments)")
+        w.line("assert False, 'exit should have aborted execution'")
+        w.dedent()
+        w.line("return tuple(command_path), command, args, kwargs")
+        w.dedent()
+
+
+def compile_command(command):
+    """
+    Generates code that parses arguments for the given `command` and its
+    subcommands and returns a :class:`CompiledParser` using it.
+    """
+    return _Compiler(command).compile()
@@ -27,6 +27,10 @@ class UnexpectedArgument(CLIError):
     pass
 
 
+class AmbiguousArgument(CLIError):
+    pass
+
+
 class ArgumentMissing(CLIError):
     pass
 
@@ -43,6 +47,27 @@ class PositionalArgumentMissing(CLIError):
     pass
 
 
+class ResponseFileError(CLIError):
+    pass
+
+
+class HelpRequested(CLIError):
+    """
+    Raised by the help option instead of printing help and exiting, if help
+    is requested while :meth:`~awwparse.Command.parse_many` parses argument
+    vectors.
+
+    The `command` help has been requested for and the `arguments` are kept,
+    so that the help can be printed later on.
+    """
+    exit_code = os.EX_OK
+
+    def __init__(self, message, command=None, arguments=None):
+        CLIError.__init__(self, message)
+        self.command = command
+        self.arguments = arguments
+
+
 class EndOptionParsing(Exception):
     pass
 
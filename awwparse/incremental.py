@@ -0,0 +1,325 @@
+# coding: utf-8
+"""
+    awwparse.incremental
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Parses arguments as they are fed one at a time, e.g. while they are typed
+    in an interactive console.
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from copy import copy
+
+from six import u
+
+from awwparse import Arguments, Option, HelpOption
+from awwparse.utils import create_repr, missing
+from awwparse.exceptions import (
+    ArgumentMissing, UnexpectedArgument, PositionalArgumentMissing
+)
+
+
+class _Snapshot(object):
+    # the state after parsing some arguments, snapshots are never modified
+    # so that they can be shared between parser states
+    __slots__ = (
+        "command", "command_path", "args", "kwargs", "position", "help"
+    )
+
+    def __init__(self, command, command_path, args, kwargs, position, help):
+        self.command = command
+        self.command_path = command_path
+        self.args = args
+        self.kwargs = kwargs
+        self.position = position
+        self.help = help
+
+
+class Expected(object):
+    """
+    Describes what a :class:`ParserState` expects as next argument.
+    """
+    __slots__ = ("positional", "required", "options", "commands")
+
+    def __init__(self, positional, required, options=(), commands=()):
+        #: The positional the next argument is parsed with, unless it is an
+        #: option or command, or ``None`` if the next argument has to be an
+        #: option or command.
+        self.positional = positional
+        #: ``True`` if the next argument is required for :attr:`positional`
+        #: and may neither be an option nor a command.
+        self.required = required
+        #: A list of the option names the next argument may be.
+        self.options = list(options)
+        #: A list of the command names the next argument may be.
+        self.commands = list(commands)
+
+    def __repr__(self):
+        return create_repr(self.__class__.__name__, kwargs={
+            "positional": self.positional,
+            "required": self.required,
+            "options": self.options,
+            "commands": self.commands
+        })
+
+
+class ParserState(object):
+    """
+    The state of parsing arguments for a `command` incrementally, which are
+    fed one at a time with :meth:`feed`.
+
+    Each argument is only parsed along with the arguments belonging to the
+    same option or positional, so the work done per argument does not depend
+    on how many arguments have been fed before. Arguments taken by a
+    positional taking all remaining arguments are parsed on their own, as
+    they are fed, and along with each other only once :meth:`finish` is
+    called. Parsed values are never
+    modified in place, which allows :meth:`fork` to create an independent
+    copy in constant time.
+
+    Unlike :meth:`Command.parse` the help option does not print help and exit
+    when it is fed but when :meth:`finish` is called.
+    """
+    __slots__ = ("_committed", "_pending", "_tentative", "_remaining")
+
+    def __init__(self, command, default_args=None, default_kwargs=None):
+        self._committed = _Snapshot(
+            command,
+            (),
+            [] if default_args is None else list(default_args),
+            {} if default_kwargs is None else dict(default_kwargs),
+            0,
+            None
+        )
+        #: The arguments of the option or positional that is being parsed,
+        #: they are parsed again along with arguments fed later on, as long
+        #: as these may belong to the same option or positional.
+        self._pending = ()
+        #: The snapshot after parsing the pending arguments, ``None`` if they
+        #: are incomplete.
+        self._tentative = None
+        #: A tuple ``(positional, arguments, count)`` once the pending
+        #: arguments belong to a positional taking all remaining arguments.
+        #: The first `count` of `arguments` have been fed since and are not
+        #: reflected by the tentative snapshot. `arguments` may be shared with
+        #: forks, which only append to it if it has `count` items.
+        self._remaining = None
+
+    @property
+    def _current(self):
+        if self._tentative is None:
+            return self._committed
+        return self._tentative
+
+    @property
+    def command(self):
+        """
+        The command that has been dispatched to.
+        """
+        return self._current.command
+
+    @property
+    def command_path(self):
+        """
+        A tuple of the names of the commands that have been dispatched to.
+        """
+        return self._current.command_path
+
+    @property
+    def complete(self):
+        """
+        ``False`` if the last option fed expects further arguments.
+        """
+        return not self._pending or self._tentative is not None
+
+    def _parse_unit(self, snapshot, arguments):
+        # parses one option, command or positional and returns the resulting
+        # snapshot and the option or positional
+        command = snapshot.command
+        # like everything else errors raised by streams are not handled
+        arguments.passthrough_errors = True
+        argument = next(arguments)
+        matches = command._get_matches(argument)
+        if matches is None:
+            if snapshot.position == len(command.positionals):
+                raise UnexpectedArgument(
+                    u("{0!r} is unexpected").format(argument)
+                )
+            positional = command.positionals[snapshot.position]
+            arguments.rewind()
+            args = positional.parse_as_positional(
+                command, list(snapshot.args), arguments
+            )
+            return _Snapshot(
+                command, snapshot.command_path, args, snapshot.kwargs,
+                snapshot.position + 1, snapshot.help
+            ), positional
+        name, match = matches[0]
+        if hasattr(match, "run"):
+            arguments.begin_frame()
+            return _Snapshot(
+                match, snapshot.command_path + (name, ), snapshot.args,
+                snapshot.kwargs, 0, snapshot.help
+            ), None
+        kwargs = dict(snapshot.kwargs)
+        help = snapshot.help
+        for name, option in matches:
+            if isinstance(option, HelpOption):
+                help = command, name, option
+                continue
+            if name in kwargs:
+                # actions may modify the previous value in place
+                kwargs[name] = copy(kwargs[name])
+            kwargs = option.parse(command, kwargs, name, arguments)
+        return _Snapshot(
+            command, snapshot.command_path, snapshot.args, kwargs,
+            snapshot.position, help
+        ), option
+
+    def feed(self, argument):
+        """
+        Parses the given `argument`.
+
+        Raises a :exc:`~awwparse.exceptions.CLIError` if `argument` is
+        unexpected or cannot be parsed, the state remains unchanged in that
+        case.
+        """
+        if self._remaining is not None:
+            positional, arguments, count = self._remaining
+            # the remaining arguments are parsed independently of each other,
+            # so the new one is parsed on its own
+            positional.parse(self._committed.command, Arguments([argument]))
+            if len(arguments) != count:
+                # a fork has appended other arguments
+                arguments = arguments[:count]
+            arguments.append(argument)
+            self._remaining = positional, arguments, count + 1
+            return
+        committed = self._committed
+        pending = self._pending + (argument, )
+        while True:
+            arguments = Arguments(pending)
+            try:
+                tentative, unit = self._parse_unit(committed, arguments)
+            except ArgumentMissing:
+                if arguments.peek() is not missing:
+                    raise
+                # the arguments the option expects have not been fed yet
+                tentative = None
+                break
+            consumed = len(arguments.get_used())
+            if (consumed == len(pending) or
+                    unit is not None and unit.remaining):
+                break
+            committed = tentative
+            pending = pending[consumed:]
+        self._committed = committed
+        self._pending = pending
+        self._tentative = tentative
+        if tentative is not None and unit is not None and unit.remaining:
+            if isinstance(unit, Option):
+                unit = [
+                    positional for positional in unit.positionals
+                    if positional.remaining
+                ][-1]
+            if not unit.stream:
+                self._remaining = unit, [], 0
+
+    def feed_many(self, arguments):
+        """
+        Parses the given `arguments` like :meth:`feed`.
+        """
+        for argument in arguments:
+            self.feed(argument)
+
+    def _get_pending_option(self):
+        matches = self._committed.command._get_matches(self._pending[0])
+        if matches is None or hasattr(matches[-1][1], "run"):
+            return None
+        return matches[-1][1]
+
+    def expected(self):
+        """
+        Returns an :class:`Expected` object describing what may be fed next.
+        """
+        positional = None
+        if self._pending:
+            option = self._get_pending_option()
+            # positionals without usage such as booleans take no argument
+            positionals = [] if option is None else [
+                positional for positional in option.positionals
+                if positional.usage
+            ]
+            if positionals:
+                index = len(self._pending) - 1
+                if self._remaining is not None:
+                    index += self._remaining[2]
+                if index < len(positionals):
+                    positional = positionals[index]
+                elif positionals[-1].remaining:
+                    positional = positionals[-1]
+                if self._tentative is None:
+                    return Expected(positional, True)
+        current = self._current
+        command = current.command
+        if positional is None:
+            if 0 < current.position <= len(command.positionals):
+                last = command.positionals[current.position - 1]
+                if last.remaining:
+                    positional = last
+            if (positional is None and
+                    current.position < len(command.positionals)):
+                positional = command.positionals[current.position]
+        index = command.dispatch_index
+        return Expected(
+            positional,
+            False,
+            sorted(list(index.shorts) + list(index.longs)),
+            list(command.commands)
+        )
+
+    def fork(self):
+        """
+        Returns an independent copy of this state.
+        """
+        return copy(self)
+
+    def finish(self):
+        """
+        Returns a tuple ``(command_path, args, kwargs)`` like
+        :meth:`Command.parse` for the arguments fed so far.
+
+        Raises a :exc:`~awwparse.exceptions.CLIError` if further arguments
+        are required.
+        """
+        if self._tentative is None and self._pending:
+            # raises the error about the missing arguments
+            self._parse_unit(self._committed, Arguments(self._pending))
+        current = self._current
+        if self._remaining is not None and self._remaining[2]:
+            _, arguments, count = self._remaining
+            current, _ = self._parse_unit(
+                self._committed,
+                Arguments(self._pending + tuple(arguments[:count]))
+            )
+        if current.help is not None:
+            command, name, option = current.help
+            option.parse(command, {}, name, Arguments([]))
+        command = current.command
+        if current.position < len(command.positionals):
+            positional = command.positionals[current.position]
+            if not positional.optional:
+                raise PositionalArgumentMissing(
+                    u("expected {positional.metavar}").format(
+                        positional=positional
+                    )
+                )
+        return current.command_path, current.args, current.kwargs
+
+    def __repr__(self):
+        return create_repr(
+            self.__class__.__name__,
+            [self._committed.command],
+            {"command_path": self.command_path, "pending": self._pending}
+        )
@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+    awwparse.namespaces
+    ~~~~~~~~~~~~~~~~~~~
+
+    Namespaces are generated classes with a slot per field, which are used
+    instead of dictionaries to collect the values of options, if
+    :attr:`~awwparse.Command.use_namespaces` is ``True``. They support the
+    mapping protocol, so that they can be used wherever a dictionary of
+    option values is expected, but need considerably less memory.
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import keyword
+
+import six
+
+from awwparse.utils import create_repr
+
+
+_namespace_classes = {}
+
+
+class Namespace(object):
+    """
+    Base class of the classes returned by :func:`create_namespace_class`,
+    which behave like a dictionary restricted to their :attr:`fields`.
+
+    Fields which have not been set are not considered to be keys. Setting a
+    key which is not a field raises a :exc:`KeyError`.
+    """
+    __slots__ = ()
+
+    #: A tuple of the field names.
+    fields = ()
+
+    #: A mapping of the field names to the names of the slots their values
+    #: are stored in. Fields which are identifiers and do not shadow an
+    #: attribute of this class are stored in a slot of the same name.
+    slot_names = {}
+
+    def __init__(self, values=(), **kwargs):
+        self.update(values, **kwargs)
+
+    def _get_slot_name(self, key):
+        try:
+            return self.slot_names[key]
+        except (KeyError, TypeError):
+            raise KeyError(key)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self.slot_names[key])
+        except (KeyError, TypeError, AttributeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            slot_name = self.slot_names[key]
+        except (KeyError, TypeError):
+            raise KeyError(key)
+        setattr(self, slot_name, value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, self._get_slot_name(key))
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            return hasattr(self, self.slot_names[key])
+        except (KeyError, TypeError):
+            return False
+
+    def get(self, key, default=None):
+        try:
+            return getattr(self, self.slot_names[key], default)
+        except (KeyError, TypeError):
+            return default
+
+    def keys(self):
+        slot_names = self.slot_names
+        return [
+            field for field in self.fields
+            if hasattr(self, slot_names[field])
+        ]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, values=(), **kwargs):
+        if hasattr(values, "keys"):
+            values = [(key, values[key]) for key in values.keys()]
+        for key, value in values:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def copy(self):
+        return self.__class__(self)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Namespace, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # generated classes cannot be looked up by name, so they are
+        # generated again when unpickling
+        return _restore_namespace, (self.fields, dict(self.items()))
+
+    def __repr__(self):
+        return create_repr(self.__class__.__name__, kwargs=dict(self.items()))
+
+
+def _restore_namespace(fields, values):
+    return create_namespace_class(fields)(values)
+
+
+def _is_identifier(string):
+    if six.PY3:
+        return string.isidentifier()
+    return string.replace("_", "").isalnum()
+
+
+def _get_slot_name(field, index):
+    # fields starting with an underscore could be mangled or clash with the
+    # names of other slots
+    if (isinstance(field, str) and field[:1].isalpha() and
+            _is_identifier(field) and not keyword.iskeyword(field) and
+            not hasattr(Namespace, field)):
+        return field
+    return "_field{0}".format(index)
+
+
+def create_namespace_class(fields):
+    """
+    Returns a subclass of :class:`Namespace` with the given `fields`.
+
+    Classes are only generated once for the same fields, so namespaces with
+    the same fields have the same class.
+    """
+    fields = tuple(fields)
+    cls = _namespace_classes.get(fields)
+    if cls is None:
+        if len(set(fields)) != len(fields):
+            raise ValueError("fields are not unique: {0!r}".format(fields))
+        slot_names = dict(
+            (field, _get_slot_name(field, index))
+            for index, field in enumerate(fields)
+        )
+        cls = _namespace_classes.setdefault(fields, type(
+            "Namespace", (Namespace, ), {
+                "__slots__": tuple(slot_names[field] for field in fields),
+                "fields": fields,
+                "slot_names": slot_names
+            }
+        ))
+    return cls
@@ -7,27 +7,25 @@
     :license: BSD, see LICENSE.rst for details
 """
 import sys
-import locale
 import codecs
 import decimal
 from abc import ABCMeta, abstractmethod
-try:
-    from urllib.parse import urlparse
-except:
-    from urlparse import urlparse
 
 import six
 from six import u
 
-try:
-    import requests
-except ImportError:
-    requests = None
+from awwparse.utils import create_repr, iter_chunks, missing
+from awwparse.exceptions import CLIError, UserTypeError, ArgumentMissing
 
-from awwparse.utils import create_repr
-from awwparse.exceptions import (
-    UserTypeError, ArgumentMissing, EndOptionParsing
-)
+
+def urlparse(url):
+    # urllib is only needed once a resource is actually parsed, importing it
+    # lazily keeps it out of the import time of every command line application
+    try:
+        from urllib.parse import urlparse
+    except ImportError:
+        from urlparse import urlparse
+    return urlparse(url)
 
 
 def parse_positional_signature(positionals, require_metavar=False, _root=True):
@@ -47,12 +45,22 @@ def parse_positional_signature(positionals, require_metavar=False, _root=True):
 
 
 class Positional(object):
+    __slots__ = (
+        "metavar", "optional", "remaining", "help", "stream", "chunk_size"
+    )
+
+    #: Whether parsed values can be cached and shared between parses, this is
+    #: not the case for values such as openers that acquire resources.
+    cacheable = True
+
     def __init__(self, metavar=None, optional=False, remaining=False,
-                 help=None):
+                 help=None, stream=False, chunk_size=None):
         self.metavar = metavar
         self.optional = optional
         self.remaining = remaining
         self.help = help
+        self.stream = stream
+        self.chunk_size = chunk_size
 
     def setdefault_metavar(self, metavar):
         if self.metavar is None:
@@ -63,7 +71,9 @@ class Positional(object):
             "metavar": self.metavar,
             "optional": self.optional,
             "remaining": self.remaining,
-            "help": self.help
+            "help": self.help,
+            "stream": self.stream,
+            "chunk_size": self.chunk_size
         }
 
     def copy(self):
@@ -78,32 +88,84 @@ class Positional(object):
     def parse(self, command, arguments):
         raise NotImplementedError()
 
+    def collect_remaining(self, command, arguments, parsed):
+        """
+        Returns the values `parsed` from the remaining `arguments` by an
+        iterator.
+
+        Unless :attr:`stream` is ``True`` they are returned as a list.
+        Otherwise an iterator is returned, so that arguments are parsed only
+        as they are consumed, if :attr:`chunk_size` is given the values are
+        yielded in lists of that size. Errors raised while the arguments are
+        parsed are handled by the `command` like errors raised before
+        :meth:`~awwparse.Command.main` is called.
+        """
+        if not self.stream:
+            return list(parsed)
+        parsed = self._handle_stream_errors(command, arguments, parsed)
+        if self.chunk_size is None:
+            return parsed
+        return iter_chunks(parsed, self.chunk_size)
+
+    def _handle_stream_errors(self, command, arguments, parsed):
+        try:
+            for value in parsed:
+                yield value
+        except CLIError:
+            if arguments.passthrough_errors:
+                raise
+            command.handle_error(sys.exc_info(), arguments)
+
+    def iter_remaining(self, command, arguments):
+        """
+        Yields values parsed with :meth:`parse_single` until `arguments` are
+        exhausted.
+        """
+        while arguments:
+            yield self.parse_single(command, arguments)
+
     def parse_as_positional(self, command, result, arguments):
         parsed = self.parse(command, arguments)
-        if self.remaining:
+        if parsed is missing:
+            pass
+        elif self.remaining and not self.stream:
             result.extend(parsed)
         else:
             result.append(parsed)
         return result
 
+    def has_argument(self, command, arguments):
+        """
+        Returns ``True`` if there is a next argument and it is not an option,
+        without consuming it.
+
+        Optional positionals use this to determine whether they can be
+        parsed, in which case :meth:`parse` returns
+        :data:`~awwparse.utils.missing` instead of raising an exception.
+        """
+        argument = arguments.peek()
+        return argument is not missing and not command.is_option(argument)
+
     def get_next_argument(self, command, arguments):
-        try:
-            argument = next(arguments)
-        except StopIteration:
+        argument = arguments.peek()
+        if argument is missing:
             raise ArgumentMissing(self.metavar)
-        else:
-            if command.is_option(argument):
-                raise ArgumentMissing(argument)
-            return argument
+        elif command.is_option(argument):
+            raise ArgumentMissing(argument)
+        return next(arguments)
 
     def __repr__(self):
         return create_repr(self.__class__.__name__, kwargs=self.copy_args())
 
 
 class EncodingPositional(Positional):
+    __slots__ = ()
+
     error_method = "replace"
 
     def get_encoding(self, command):
+        # locale imports re, which is not needed otherwise
+        import locale
         return getattr(command, "stdin.encoding", locale.getpreferredencoding())
 
 
@@ -111,6 +173,8 @@ class Bytes(EncodingPositional):
     """
     Represents a binary argument.
     """
+    __slots__ = ()
+
     def encode(self, string, encoding):
         if isinstance(string, six.binary_type):
             return string
@@ -127,22 +191,23 @@ class Bytes(EncodingPositional):
     def parse(self, command, arguments):
         encoding = self.get_encoding(command)
         if self.remaining:
-            return [self.encode(string, encoding) for string in arguments]
-        try:
-            return self.encode(
-                self.get_next_argument(command, arguments),
-                encoding
-            )
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(command, arguments, (
+                self.encode(string, encoding) for string in arguments
+            ))
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.encode(
+            self.get_next_argument(command, arguments),
+            encoding
+        )
 
 
 class String(EncodingPositional):
     """
     Represents a string argument.
     """
+    __slots__ = ()
+
     def decode(self, bytes, encoding):
         if isinstance(bytes, six.text_type):
             return bytes
@@ -159,34 +224,36 @@ class String(EncodingPositional):
     def parse(self, command, arguments):
         encoding = self.get_encoding(command)
         if self.remaining:
-            return [self.decode(bytes, encoding) for bytes in arguments]
-        try:
-            return self.decode(
-                self.get_next_argument(command, arguments),
-                encoding
-            )
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(command, arguments, (
+                self.decode(bytes, encoding) for bytes in arguments
+            ))
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.decode(
+            self.get_next_argument(command, arguments),
+            encoding
+        )
 
 
 class NativeString(Positional):
     """
     Represents a "native" string argument.
     """
+    __slots__ = ()
+
     def parse(self, command, arguments):
         if self.remaining:
-            return list(arguments)
-        try:
-            return self.get_next_argument(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(command, arguments, (
+                argument for argument in arguments
+            ))
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.get_next_argument(command, arguments)
 
 
 class ConverterBase(Positional):
+    __slots__ = ()
+
     type = None
     type_conversion_exception = ValueError
     error_message = u("")
@@ -199,21 +266,20 @@ class ConverterBase(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            return list(map(self.convert, arguments))
-        try:
-            argument = self.get_next_argument(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
-        else:
-            return self.convert(argument)
+            return self.collect_remaining(command, arguments, (
+                self.convert(argument) for argument in arguments
+            ))
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.convert(self.get_next_argument(command, arguments))
 
 
 class Integer(ConverterBase):
     """
     Represents an integer argument.
     """
+    __slots__ = ()
+
     type = int
     error_message = u("{argument!r} is not an integer")
 
@@ -222,6 +288,8 @@ class Float(ConverterBase):
     """
     Represents a float argument.
     """
+    __slots__ = ()
+
     type = float
     error_message = u("{argument!r} is not a float")
 
@@ -230,6 +298,8 @@ class Decimal(ConverterBase):
     """
     Like :class:`Float` but uses :class:`decimal.Decimal` for higher precision.
     """
+    __slots__ = ()
+
     type = decimal.Decimal
     type_conversion_exception = decimal.InvalidOperation
     error_message = u("{argument!r} is not a decimal")
@@ -239,6 +309,8 @@ class Complex(ConverterBase):
     """
     Represents a complex number argument.
     """
+    __slots__ = ()
+
     type = complex
     error_message = u("{argument!r} is not a complex number")
 
@@ -250,6 +322,8 @@ class Any(ConverterBase):
     Raises a :exc:`UserTypeError` with the given `error_message` if no
     positional successfully parses.
     """
+    __slots__ = ("positionals", "error_message")
+
     def __init__(self, positionals, error_message, **kwargs):
         ConverterBase.__init__(self, **kwargs)
         self.positionals = positionals
@@ -285,6 +359,8 @@ class Number(Any):
     """
     Represents an integer, a float or a complex number.
     """
+    __slots__ = ("use_decimal",)
+
     def __init__(self, use_decimal=False, **kwargs):
         Any.__init__(
             self,
@@ -309,6 +385,8 @@ class Boolean(Positional):
     """
     Represents a boolean.
     """
+    __slots__ = ("store",)
+
     def __init__(self, store=True, **kwargs):
         Positional.__init__(self, **kwargs)
         self.store = store
@@ -334,6 +412,8 @@ class Choice(Positional):
     Represents a choice between `choices` where the choice is something of
     `argument`.
     """
+    __slots__ = ("argument", "choices")
+
     def __init__(self, argument, choices, **kwargs):
         Positional.__init__(self, **kwargs)
         self.argument = argument
@@ -347,6 +427,10 @@ class Choice(Positional):
         })
         return args
 
+    @property
+    def cacheable(self):
+        return self.argument.cacheable
+
     def parse_single(self, command, arguments):
         parsed = self.argument.parse(command, arguments)
         if parsed not in self.choices:
@@ -360,16 +444,12 @@ class Choice(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            result = []
-            while arguments:
-                result.append(self.parse_single(command, arguments))
-            return result
-        try:
-            return self.parse_single(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(
+                command, arguments, self.iter_remaining(command, arguments)
+            )
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.parse_single(command, arguments)
 
     def __repr__(self):
         return create_repr(
@@ -383,6 +463,8 @@ class Mapping(Positional):
     """
     Like :class:`Choice` but uses a mapping and returns the value.
     """
+    __slots__ = ("positional", "mapping")
+
     def __init__(self, positional, mapping, **kwargs):
         Positional.__init__(self, **kwargs)
         self.positional = positional
@@ -396,6 +478,10 @@ class Mapping(Positional):
         })
         return args
 
+    @property
+    def cacheable(self):
+        return self.positional.cacheable
+
     def parse_single(self, command, arguments):
         parsed = self.positional.parse(command, arguments)
         try:
@@ -408,16 +494,12 @@ class Mapping(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            result = []
-            while arguments:
-                result.append(self.parse_single(command, arguments))
-            return result
-        try:
-            return self.parse_single(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(
+                command, arguments, self.iter_remaining(command, arguments)
+            )
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.parse_single(command, arguments)
 
     def __repr__(self):
         return create_repr(
@@ -444,6 +526,10 @@ class File(Positional):
 
     .. _open(): http://docs.python.org/dev/library/functions.html#open
     """
+    __slots__ = ("mode", "buffering", "encoding", "errors", "newline", "opener")
+
+    cacheable = False
+
     def __init__(self, mode="r", buffering=-1, encoding=None, errors=None,
                  newline=None, opener=None, **kwargs):
         Positional.__init__(self, **kwargs)
@@ -468,16 +554,12 @@ class File(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            result = []
-            while arguments:
-                result.append(self.parse_single(command, arguments))
-            return result
-        try:
-            return self.parse_single(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(
+                command, arguments, self.iter_remaining(command, arguments)
+            )
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.parse_single(command, arguments)
 
     def parse_single(self, command, arguments):
         return FileOpener(
@@ -511,6 +593,13 @@ class LocalResource(Positional):
     `r` or `w` which will open `sys.stdin` and `sys.stdout` respectively,
     otherwise a :exc:`ValueError` will be raised.
     """
+    __slots__ = (
+        "mode", "buffering", "encoding", "errors", "newline", "opener",
+        "std_stream_argument", "allow_std_streams", "close_std_stream"
+    )
+
+    cacheable = False
+
     def __init__(self, mode="r", buffering=-1, encoding=None, errors=None,
                  newline=None, opener=None, std_stream_argument="-",
                  allow_std_streams=True, close_std_stream=False, **kwargs):
@@ -546,16 +635,12 @@ class LocalResource(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            result = []
-            while arguments:
-                result.append(self.parse_single(command, arguments))
-            return result
-        try:
-            return self.parse_single(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(
+                command, arguments, self.iter_remaining(command, arguments)
+            )
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.parse_single(command, arguments)
 
     def parse_single(self, command, arguments):
         return LocalResourceOpener(
@@ -588,6 +673,10 @@ class Resource(Positional):
     .. note:: In order to access HTTP resources `requests` needs to be
               installed.
     """
+    __slots__ = ("schemes", "opener_arguments")
+
+    cacheable = False
+
     def __init__(self, schemes=None, opener_arguments=None, **kwargs):
         Positional.__init__(self, **kwargs)
         self.schemes = schemes
@@ -614,16 +703,12 @@ class Resource(Positional):
 
     def parse(self, command, arguments):
         if self.remaining:
-            result = []
-            while arguments:
-                result.append(self.parse_single(command, arguments))
-            return result
-        try:
-            return self.parse_single(command, arguments)
-        except ArgumentMissing:
-            if self.optional:
-                raise EndOptionParsing()
-            raise
+            return self.collect_remaining(
+                command, arguments, self.iter_remaining(command, arguments)
+            )
+        if self.optional and not self.has_argument(command, arguments):
+            return missing
+        return self.parse_single(command, arguments)
 
     def parse_single(self, command, arguments):
         return SchemeDispatchingOpener(
@@ -638,6 +723,8 @@ class Opener(object):
     """
     A base class for context managers that acquire and release resources.
     """
+    __slots__ = ("command", "resource")
+
     __metaclass__ = ABCMeta
 
     def __init__(self, command):
@@ -671,6 +758,10 @@ class Opener(object):
 
 
 class FileOpener(Opener):
+    __slots__ = (
+        "path", "mode", "buffering", "encoding", "errors", "newline", "opener"
+    )
+
     def __init__(self, command, path, mode="r", buffering=-1, encoding=None,
                  errors=None, newline=None, opener=None):
         Opener.__init__(self, command)
@@ -734,6 +825,8 @@ class FileOpener(Opener):
 
 
 class StandardStreamOpener(Opener):
+    __slots__ = ("stream", "should_close", "encoding", "errors")
+
     def __init__(self, command, stream, should_close=False, encoding=None,
                  errors=None):
         Opener.__init__(self, command)
@@ -774,6 +867,12 @@ class StandardStreamOpener(Opener):
 
 
 class LocalResourceOpener(Opener):
+    __slots__ = (
+        "std_stream_resource", "allow_std_streams", "close_std_stream", "url",
+        "_mode", "buffering", "encoding", "errors", "newline", "opener",
+        "_opener"
+    )
+
     std_stream_modes = frozenset(["r", "w"])
 
     def __init__(self, command, url, mode="r", buffering=-1, encoding=None,
@@ -840,17 +939,24 @@ class LocalResourceOpener(Opener):
 
 
 class HTTPRequestOpener(Opener):
+    __slots__ = ("requests", "url", "kwargs")
+
     def __init__(self, command, url, **kwargs):
         Opener.__init__(self, command)
-        if requests is None:
+        try:
+            # requests takes longer to import than everything else together,
+            # so we only import it if someone actually makes a request
+            import requests
+        except ImportError:
             raise RuntimeError("requires 'requests' to be installed")
+        self.requests = requests
         self.url = url
         self.kwargs = kwargs
         headers = self.kwargs.setdefault("headers", {})
         headers.setdefault("User-Agent", "Awwparse/0.1-dev")
 
     def acquire_resource(self):
-        return requests.get(self.url, **self.kwargs)
+        return self.requests.get(self.url, **self.kwargs)
 
     def release_resource(self, response):
         # response objects cannot be closed
@@ -858,6 +964,8 @@ class HTTPRequestOpener(Opener):
 
 
 class SchemeDispatchingOpener(Opener):
+    __slots__ = ("schemes", "opener")
+
     default_schemes = {
         "": LocalResourceOpener,
         "file": FileOpener,
@@ -0,0 +1,297 @@
+# coding: utf-8
+"""
+    awwparse.spec
+    ~~~~~~~~~~~~~
+
+    Loads commands from and dumps them to declarative specifications, which
+    are made up of dictionaries, lists and values only.
+
+    A command is specified by a dictionary like this::
+
+        {
+            "help": "Manages remotes",
+            "options": [
+                {
+                    "name": "verbose",
+                    "short": "-v",
+                    "long": "--verbose",
+                    "positionals": [{"type": "Boolean"}],
+                    "help": "Be verbose"
+                },
+                {
+                    "name": "tags",
+                    "long": "--tag",
+                    "positionals": [{"type": "String", "metavar": "tag"}],
+                    "action": "append_to_list"
+                }
+            ],
+            "positionals": [
+                {"type": "String", "metavar": "name"},
+                {
+                    "type": "Choice",
+                    "argument": {"type": "String"},
+                    "choices": ["fetch", "push"],
+                    "metavar": "direction",
+                    "optional": True
+                }
+            ],
+            "commands": [
+                {"name": "add", "help": "Adds a remote", ...},
+                {"name": "prune", "import_path": "app.commands:Prune"}
+            ]
+        }
+
+    All keys are optional except for the ``"name"`` of options and
+    subcommands and the ``"type"`` of positionals. The remaining keys of a
+    positional are passed to the positional type as keyword arguments, nested
+    positionals such as the ``"argument"`` of a
+    :class:`~awwparse.positionals.Choice` are specified in the same way.
+    Subcommands with an ``"import_path"`` are loaded lazily, see
+    :class:`~awwparse.LazyCommand`, only those may specify a ``"usage"``.
+    Unknown keys of commands and options are rejected.
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import json
+
+import six
+
+from awwparse import Command, Option, HelpOption, LazyCommand
+from awwparse import positionals as _positionals
+from awwparse import actions as _actions
+from awwparse.utils import _getargspec
+
+
+#: A mapping of the positional type names used in specifications to
+#: positional classes, custom positionals may be registered here.
+POSITIONAL_TYPES = dict(
+    (name, getattr(_positionals, name)) for name in [
+        "Bytes", "String", "NativeString", "Integer", "Float", "Decimal",
+        "Complex", "Any", "Number", "Boolean", "Choice", "Mapping", "File",
+        "LocalResource", "Resource"
+    ]
+)
+
+#: A mapping of the action names used in specifications to actions, custom
+#: actions may be registered here.
+ACTIONS = dict(
+    (name, getattr(_actions, name)) for name in [
+        "store_last", "append_to_list", "add_to_set", "add", "sub"
+    ]
+)
+
+#: The keys of command specifications, subcommands have a name as well.
+COMMAND_KEYS = frozenset(["help", "options", "positionals", "commands"])
+
+#: The keys of lazily loaded subcommand specifications.
+LAZY_COMMAND_KEYS = frozenset(["name", "import_path", "help", "usage"])
+
+#: The keys of option specifications.
+OPTION_KEYS = frozenset([
+    "name", "short", "long", "positionals", "action", "help"
+])
+
+#: The keyword arguments of positional types which take positionals.
+NESTED_POSITIONALS = {
+    _positionals.Any: ["positionals"],
+    _positionals.Choice: ["argument"],
+    _positionals.Mapping: ["positional"]
+}
+
+
+def _get_nested_positionals(cls):
+    names = []
+    for base, arguments in NESTED_POSITIONALS.items():
+        if issubclass(cls, base):
+            names.extend(arguments)
+    return names
+
+
+def _get_defaults(cls):
+    defaults = {}
+    for base in cls.__mro__:
+        init = base.__dict__.get("__init__")
+        if init is None or base is object:
+            continue
+        argspec = _getargspec(init)
+        if argspec.defaults:
+            defaults.update(
+                (name, default) for name, default in zip(
+                    argspec.args[-len(argspec.defaults):], argspec.defaults
+                ) if name not in defaults
+            )
+    return defaults
+
+
+def _check_keys(spec, keys, kind):
+    unknown = set(spec) - keys
+    if unknown:
+        raise ValueError("unknown {0} keys: {1}".format(
+            kind, ", ".join(sorted(map(repr, unknown)))
+        ))
+
+
+def _get_name(registry, obj, kind):
+    for name, registered in registry.items():
+        if registered is obj:
+            return name
+    raise ValueError("{0} not registered: {1!r}".format(kind, obj))
+
+
+def load_positional(spec):
+    """
+    Returns a positional for the given `spec`.
+    """
+    if "type" not in spec:
+        raise ValueError("positional type missing: {0!r}".format(spec))
+    arguments = dict(spec)
+    try:
+        cls = POSITIONAL_TYPES[arguments.pop("type")]
+    except KeyError as error:
+        raise ValueError("unknown positional type: {0}".format(error))
+    for name in _get_nested_positionals(cls):
+        if name not in arguments:
+            continue
+        if isinstance(arguments[name], list):
+            arguments[name] = list(map(load_positional, arguments[name]))
+        else:
+            arguments[name] = load_positional(arguments[name])
+    return cls(**dict(
+        (str(name), value) for name, value in arguments.items()
+    ))
+
+
+def dump_positional(positional):
+    """
+    Returns a specification for the given `positional`.
+
+    Raises :exc:`ValueError` if the type of `positional` is not registered in
+    :data:`POSITIONAL_TYPES`.
+    """
+    cls = positional.__class__
+    spec = {"type": _get_name(POSITIONAL_TYPES, cls, "positional type")}
+    defaults = _get_defaults(cls)
+    nested = _get_nested_positionals(cls)
+    for name, value in positional.copy_args().items():
+        if name in defaults and defaults[name] == value:
+            continue
+        if name in nested:
+            if isinstance(value, list):
+                value = list(map(dump_positional, value))
+            else:
+                value = dump_positional(value)
+        spec[name] = value
+    return spec
+
+
+def load_option(spec):
+    """
+    Returns a tuple ``(name, option)`` for the given `spec`.
+    """
+    _check_keys(spec, OPTION_KEYS, "option")
+    signature = [
+        spec[name] for name in ["short", "long"] if spec.get(name) is not None
+    ]
+    signature.extend(map(load_positional, spec.get("positionals", [])))
+    try:
+        action = ACTIONS[spec.get("action", "store_last")]
+    except KeyError as error:
+        raise ValueError("unknown action: {0}".format(error))
+    return spec["name"], Option(
+        *signature, action=action, help=spec.get("help")
+    )
+
+
+def dump_option(name, option):
+    """
+    Returns a specification for the given `option` named `name`.
+
+    Raises :exc:`ValueError` if `option` is not an :class:`~awwparse.Option`
+    or if its action is not registered in :data:`ACTIONS`.
+    """
+    if option.__class__ is not Option:
+        raise ValueError("cannot dump option: {0!r}".format(option))
+    spec = {"name": name}
+    if option.short is not None:
+        spec["short"] = option.short
+    if option.long is not None:
+        spec["long"] = option.long
+    spec["positionals"] = list(map(dump_positional, option.positionals))
+    if option.action is not _actions.store_last:
+        spec["action"] = _get_name(ACTIONS, option.action, "action")
+    if option.help is not None:
+        spec["help"] = option.help
+    return spec
+
+
+def load(spec, command=None):
+    """
+    Returns a command for the given `spec`, which may be a dictionary or a
+    JSON encoded string.
+
+    The options, positionals, subcommands and help of the specification are
+    added to `command` if given, this allows loading a specification into a
+    :class:`~awwparse.CLI`. Otherwise and for all subcommands a
+    :class:`~awwparse.Command` is created. As those do not implement
+    :meth:`~awwparse.Command.main`, the result of parsing is usually
+    obtained with :meth:`~awwparse.Command.parse`.
+    """
+    if isinstance(spec, six.string_types):
+        spec = json.loads(spec)
+    _check_keys(spec, COMMAND_KEYS, "command")
+    if command is None:
+        command = Command()
+    if spec.get("help") is not None:
+        command.help = spec["help"]
+    command.add_options(map(load_option, spec.get("options", [])))
+    command.add_positionals(map(load_positional, spec.get("positionals", [])))
+    for subcommand in spec.get("commands", []):
+        if "import_path" in subcommand:
+            _check_keys(subcommand, LAZY_COMMAND_KEYS, "lazy command")
+            command.add_command(subcommand["name"], LazyCommand(
+                subcommand["import_path"],
+                help=subcommand.get("help"),
+                usage=subcommand.get("usage")
+            ))
+        else:
+            subcommand = dict(subcommand)
+            name = subcommand.pop("name")
+            command.add_command(name, load(subcommand))
+    return command
+
+
+def dump(command):
+    """
+    Returns a specification for the given `command`, including its
+    subcommands, which can be loaded with :func:`load`.
+
+    Lazy commands that have not been loaded yet are dumped as such. Raises
+    :exc:`ValueError` if the command contains an option, positional or action
+    which cannot be specified.
+    """
+    spec = {}
+    if command.help is not None:
+        spec["help"] = command.help
+    options = [
+        dump_option(name, option) for option, name in command.options.items()
+        if not isinstance(option, HelpOption)
+    ]
+    if options:
+        spec["options"] = options
+    if command.positionals:
+        spec["positionals"] = list(map(dump_positional, command.positionals))
+    commands = []
+    for name, subcommand in command.commands.items():
+        if isinstance(subcommand, LazyCommand):
+            subspec = {"name": name, "import_path": subcommand.import_path}
+            if subcommand.help is not None:
+                subspec["help"] = subcommand.help
+            if subcommand.usage is not None:
+                subspec["usage"] = subcommand.usage
+        else:
+            subspec = dict(dump(subcommand), name=name)
+        commands.append(subspec)
+    if commands:
+        spec["commands"] = commands
+    return spec
@@ -73,9 +73,13 @@ def make_suite(test_cases):
 def suite():
     #: .. todo:: Automatically import and add suites from everything below
     #:           :mod:`awwparse.testsuite`.
-    from awwparse.testsuite import utils, init, positionals, actions
+    from awwparse.testsuite import (
+        utils, init, positionals, actions, cache, compiler, spec, incremental,
+        namespaces
+    )
     return unittest.TestSuite([
-        utils.suite, init.suite, positionals.suite, actions.suite
+        utils.suite, init.suite, positionals.suite, actions.suite, cache.suite,
+        compiler.suite, spec.suite, incremental.suite, namespaces.suite
     ])
 
 
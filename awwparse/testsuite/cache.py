@@ -0,0 +1,181 @@
+# coding: utf-8
+"""
+    awwparse.testsuite.cache
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import sys
+import uuid
+import shutil
+import tempfile
+
+from awwparse import CLI, Command, Option, Integer, String, append_to_list
+from awwparse.cache import (
+    load_command, get_dependencies, dump_match_counts, load_match_counts
+)
+from awwparse.testsuite import (
+    TestCase, make_suite, get_test_file_path, file_cleaner
+)
+
+
+class SpamCommand(Command):
+    positionals = String(metavar="eggs")
+
+    def main(self, eggs, **kwargs):
+        return eggs, kwargs
+
+
+class CachedCLI(CLI):
+    options = [("foo", Option("-a", Integer(), action=append_to_list))]
+    commands = {"spam": SpamCommand()}
+
+    built = 0
+
+    def __init__(self):
+        CLI.__init__(self, application_name="app")
+        CachedCLI.built += 1
+
+
+class LoadCommandTestCase(TestCase):
+    def setup(self):
+        CachedCLI.built = 0
+        self.cache_path = get_test_file_path(
+            "awwparse.testsuite.cache.LoadCommandTestCase"
+        )
+
+    def teardown(self):
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+
+    def test_load_command(self):
+        built = load_command(CachedCLI, self.cache_path)
+        self.assert_equal(CachedCLI.built, 1)
+        self.assert_true(os.path.exists(self.cache_path))
+
+        loaded = load_command(CachedCLI, self.cache_path)
+        self.assert_equal(CachedCLI.built, 1)
+        self.assert_is_not(loaded, built)
+        self.assert_is(loaded.stdout, sys.stdout)
+        arguments = ["-a", "1", "-a", "2", "spam", "foo"]
+        self.assert_equal(loaded.run(arguments), built.run(arguments))
+        self.assert_is(loaded.commands["spam"].parent, loaded)
+
+    def test_stale(self):
+        dependency = get_test_file_path(
+            "awwparse.testsuite.cache.LoadCommandTestCase.test_stale"
+        )
+        with file_cleaner([dependency]):
+            with open(dependency, "w") as file:
+                file.write("foo")
+            load_command(CachedCLI, self.cache_path, [dependency])
+            load_command(CachedCLI, self.cache_path, [dependency])
+            self.assert_equal(CachedCLI.built, 1)
+
+            with open(dependency, "w") as file:
+                file.write("foobar")
+            load_command(CachedCLI, self.cache_path, [dependency])
+            self.assert_equal(CachedCLI.built, 2)
+            load_command(
+                CachedCLI, self.cache_path, [dependency], use_hashes=True
+            )
+            self.assert_equal(CachedCLI.built, 3)
+            load_command(
+                CachedCLI, self.cache_path, [dependency], use_hashes=True
+            )
+            self.assert_equal(CachedCLI.built, 3)
+
+    def test_factory_module(self):
+        directory = tempfile.mkdtemp()
+        module_name = "awwparse_test_factory_{0}".format(
+            uuid.uuid4().hex
+        )
+        module_path = os.path.join(directory, module_name + ".py")
+        source = (
+            "from awwparse.testsuite.cache import CachedCLI\n"
+            "def factory():\n"
+            "    return CachedCLI()\n"
+        )
+        with open(module_path, "w") as file:
+            file.write(source)
+        sys.path.insert(0, directory)
+        try:
+            module = __import__(module_name)
+            load_command(module.factory, self.cache_path)
+            load_command(module.factory, self.cache_path)
+            self.assert_equal(CachedCLI.built, 1)
+
+            with open(module_path, "w") as file:
+                file.write(source + "# changed\n")
+            load_command(module.factory, self.cache_path)
+            self.assert_equal(CachedCLI.built, 2)
+        finally:
+            sys.path.remove(directory)
+            sys.modules.pop(module_name, None)
+            shutil.rmtree(directory)
+
+    def test_corrupt(self):
+        with open(self.cache_path, "wb") as file:
+            file.write(b"garbage")
+        self.assert_is_instance(
+            load_command(CachedCLI, self.cache_path), CachedCLI
+        )
+        self.assert_equal(CachedCLI.built, 1)
+        load_command(CachedCLI, self.cache_path)
+        self.assert_equal(CachedCLI.built, 1)
+
+    def test_unpicklable(self):
+        class LocalCommand(Command):
+            pass
+        self.assert_is_instance(
+            load_command(LocalCommand, self.cache_path), LocalCommand
+        )
+        self.assert_false(os.path.exists(self.cache_path))
+
+    def test_get_dependencies(self):
+        dependencies = get_dependencies(CachedCLI())
+        for module_name in ["awwparse", "awwparse.positionals", __name__]:
+            path = os.path.abspath(sys.modules[module_name].__file__)
+            if path.endswith(".pyc"):
+                path = path[:-1]
+            self.assert_in(path, dependencies)
+
+
+class MatchCountsTestCase(TestCase):
+    def setup(self):
+        self.path = get_test_file_path(
+            "awwparse.testsuite.cache.MatchCountsTestCase"
+        )
+
+    def teardown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_dump_and_load(self):
+        cli = CachedCLI()
+        cli.set_match_counts({"-a": 2})
+        cli.commands["spam"].set_match_counts({"--help": 1})
+        dump_match_counts(cli, self.path)
+
+        loaded = CachedCLI()
+        self.assert_true(load_match_counts(loaded, self.path))
+        self.assert_equal(loaded.match_counts, {"-a": 2})
+        self.assert_equal(
+            loaded.commands["spam"].match_counts, {"--help": 1}
+        )
+
+        # commands that no longer exist are ignored
+        self.assert_true(load_match_counts(SpamCommand(), self.path))
+
+    def test_corrupt(self):
+        cli = CachedCLI()
+        self.assert_false(load_match_counts(cli, self.path))
+        with open(self.path, "wb") as file:
+            file.write(b"garbage")
+        self.assert_false(load_match_counts(cli, self.path))
+        self.assert_equal(cli.match_counts, {})
+
+
+suite = make_suite([LoadCommandTestCase, MatchCountsTestCase])
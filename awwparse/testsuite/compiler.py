@@ -0,0 +1,185 @@
+# coding: utf-8
+"""
+    awwparse.testsuite.compiler
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from six import u, StringIO
+
+from awwparse import (
+    Command, Option, Integer, String, Boolean, Choice, Float, LazyCommand,
+    append_to_list, add
+)
+from awwparse.compiler import CompiledParser
+from awwparse.exceptions import CLIError, UserTypeError
+from awwparse.testsuite import (
+    TestCase, TestCommand, TestCLI, make_suite
+)
+
+
+class Counter(Option):
+    # matches -v, -vv, -vvv and so on in addition to the long name
+    def matches(self, argument):
+        if argument.startswith("-v") and set(argument[1:]) == set("v"):
+            return True, ""
+        return Option.matches(self, argument)
+
+    def parse(self, command, namespace, name, arguments):
+        namespace[name] = namespace.get(name, 0) + 1
+        return namespace
+
+
+class Remote(TestCommand):
+    options = [("verbose", Option("-v", "--verbose", Boolean()))]
+    positionals = [
+        String(metavar="name"),
+        String(metavar="url", optional=True)
+    ]
+    commands = {"add": TestCommand(
+        options=[("track", Option("-t", String(), action=append_to_list))],
+        positionals=[String(metavar="branch", remaining=True)]
+    )}
+
+
+class Tool(TestCommand):
+    allow_abbreviated_longs = True
+
+    options = [
+        ("config", Option("-c", "--config", String())),
+        ("numbers", Option("-n", "--number", Integer(),
+                           action=append_to_list)),
+        ("total", Option("-t", "--total", Integer(), action=add)),
+        ("point", Option("--point", Float(), Float())),
+        ("level", Option("-l", "--level", Integer(), Integer(optional=True))),
+        ("color", Option("--color", Choice(String(), ["red", "green"]))),
+        ("quiet", Option("-q", "--quiet", Boolean())),
+        ("all", Option("-a", Boolean())),
+        ("rest", Option("-r", "--rest", String(remaining=True)))
+    ]
+
+    commands = {
+        "remote": Remote(),
+        "lazy": LazyCommand("awwparse.testsuite:TestCommand")
+    }
+
+    @Command.from_method(Integer(metavar="count"))
+    def repeat(self, count):
+        return count
+
+
+def create_tree():
+    command = Tool()
+    command.add_option("debug", Counter("--debug", Boolean()))
+    return command
+
+
+def parse(parser, arguments):
+    try:
+        return parser.parse(arguments, passthrough_errors=True)
+    except CLIError as error:
+        return error.__class__, error.args
+
+
+class CompilerTestCase(TestCase):
+    argument_vectors = [
+        [],
+        ["-c", "foo"],
+        ["--config", "foo", "-c", "bar"],
+        ["-n", "1", "--number", "2", "-n3"],
+        ["-t", "1", "-t", "2", "--total", "3"],
+        ["--point", "1.5", "2.5"],
+        ["-l", "1"],
+        ["-l", "1", "2"],
+        ["-l", "1", "-q"],
+        ["--color", "red"],
+        ["--color", "blue"],
+        ["-qa"],
+        ["-aq", "-n", "1"],
+        ["-vvv", "-v", "--debug"],
+        ["--conf", "foo"],
+        ["--co", "red"],
+        ["--c", "foo"],
+        ["-r", "a", "-b", "--config"],
+        ["-c"],
+        ["-n", "foo"],
+        ["--unknown"],
+        ["unknown"],
+        ["--"],
+        ["remote", "origin"],
+        ["remote", "-v", "origin", "http://example.com"],
+        ["remote", "origin", "url", "surplus"],
+        ["remote"],
+        ["-q", "remote", "origin", "-v"],
+        ["remote", "add", "-t", "a", "-t", "b", "master", "-t", "c"],
+        ["remote", "add"],
+        ["lazy"],
+        ["lazy", "foo"],
+        ["repeat", "3"],
+        ["repeat", "three"],
+        ["repeat"]
+    ]
+
+    def test_compile(self):
+        command = create_tree()
+        parser = command.compile()
+        self.assert_is_instance(parser, CompiledParser)
+        self.assert_is(parser.command, command)
+        self.assert_in("def parse(", parser.source)
+
+    def test_parse(self):
+        command = create_tree()
+        parser = command.compile()
+        for arguments in self.argument_vectors:
+            self.assert_equal(
+                parse(parser, arguments), parse(command, arguments)
+            )
+        # parsing with the interpreter loads the lazy command, both parsers
+        # have to agree on the loaded command as well
+        for arguments in self.argument_vectors:
+            self.assert_equal(
+                parse(parser, arguments), parse(create_tree(), arguments)
+            )
+
+    def test_defaults(self):
+        command = create_tree()
+        parser = command.compile()
+        self.assert_equal(
+            parser.parse(["remote", "foo"], ["a"], {"config": "b"}),
+            command.parse(["remote", "foo"], ["a"], {"config": "b"})
+        )
+
+    def test_run(self):
+        command = create_tree()
+        parser = command.compile()
+        for arguments in [["-c", "foo"], ["repeat", "1"], ["remote", "a"]]:
+            self.assert_equal(
+                parser.run(arguments), command.run(arguments)
+            )
+
+    def test_error_handling(self):
+        def create_cli(stringio):
+            def exit(code):
+                assert code != 1
+            return TestCLI(
+                application_name=u("app"),
+                stdout=stringio,
+                stderr=stringio,
+                exit=exit,
+                options=[("foo", Option("-o", Integer()))]
+            )
+        outputs = []
+        for compile in [False, True]:
+            stringio = StringIO()
+            cli = create_cli(stringio)
+            parser = cli.compile() if compile else cli
+            with self.assert_raises(AssertionError):
+                parser.run(["-o", "foo"])
+            with self.assert_raises(UserTypeError):
+                parser.run(["-o", "foo"], passthrough_errors=True)
+            outputs.append(stringio.getvalue())
+        self.assert_equal(outputs[0], outputs[1])
+
+
+suite = make_suite([CompilerTestCase])
@@ -0,0 +1,216 @@
+# coding: utf-8
+"""
+    awwparse.testsuite.incremental
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from six import u, StringIO
+
+from awwparse import Option, Integer, String, append_to_list
+from awwparse.incremental import ParserState
+from awwparse.exceptions import (
+    CLIError, ArgumentMissing, UserTypeError, UnexpectedArgument,
+    PositionalArgumentMissing
+)
+from awwparse.testsuite import TestCase, TestCommand, TestCLI, make_suite
+from awwparse.testsuite.compiler import CompilerTestCase, create_tree
+
+
+def parse_incrementally(command, arguments):
+    state = command.create_parser_state()
+    try:
+        for argument in arguments:
+            state.feed(argument)
+        return state.finish()
+    except CLIError as error:
+        return error.__class__, error.args
+
+
+class CountingInteger(Integer):
+    __slots__ = ()
+
+    parsed = 0
+
+    def parse(self, command, arguments):
+        CountingInteger.parsed += 1
+        return Integer.parse(self, command, arguments)
+
+
+class CountingConversions(Integer):
+    __slots__ = ()
+
+    converted = 0
+
+    def convert(self, argument):
+        CountingConversions.converted += 1
+        return Integer.convert(self, argument)
+
+
+class ParserStateTestCase(TestCase):
+    def test_parse(self):
+        for arguments in CompilerTestCase.argument_vectors:
+            try:
+                expected = create_tree().parse(
+                    arguments, passthrough_errors=True
+                )
+            except CLIError as error:
+                expected = error.__class__, error.args
+            self.assert_equal(
+                parse_incrementally(create_tree(), arguments), expected
+            )
+
+    def test_feed(self):
+        state = create_tree().create_parser_state()
+        self.assert_is_instance(state, ParserState)
+        state.feed("-c")
+        self.assert_false(state.complete)
+        with self.assert_raises(ArgumentMissing):
+            state.finish()
+        state.feed("foo")
+        self.assert_true(state.complete)
+        state.feed_many(["-n", "1", "-n", "2", "remote"])
+        self.assert_equal(state.command_path, ("remote", ))
+        self.assert_is(state.command, state.command.parent.commands["remote"])
+        with self.assert_raises(PositionalArgumentMissing):
+            state.finish()
+        state.feed("origin")
+        self.assert_equal(
+            state.finish(),
+            (("remote", ), ["origin"], {"config": "foo", "numbers": [1, 2]})
+        )
+
+    def test_errors(self):
+        state = create_tree().create_parser_state()
+        state.feed_many(["-n", "1", "--number"])
+        with self.assert_raises(UserTypeError):
+            state.feed("foo")
+        with self.assert_raises(ArgumentMissing):
+            state.feed("-c")
+        # the state is unchanged by errors
+        state.feed("2")
+        with self.assert_raises(UnexpectedArgument):
+            state.feed("foo")
+        self.assert_equal(state.finish(), ((), [], {"numbers": [1, 2]}))
+
+    def test_expected(self):
+        state = create_tree().create_parser_state()
+        expected = state.expected()
+        self.assert_is(expected.positional, None)
+        self.assert_false(expected.required)
+        self.assert_in("--config", expected.options)
+        self.assert_in("-c", expected.options)
+        self.assert_equal(expected.commands, ["remote", "lazy", "repeat"])
+
+        state.feed("--level")
+        expected = state.expected()
+        self.assert_equal(expected.positional.metavar, "level")
+        self.assert_false(expected.positional.optional)
+        self.assert_true(expected.required)
+        self.assert_equal(expected.options, [])
+        self.assert_equal(expected.commands, [])
+
+        state.feed("1")
+        expected = state.expected()
+        self.assert_true(expected.positional.optional)
+        self.assert_false(expected.required)
+
+        state.feed_many(["2", "-q"])
+        self.assert_is(state.expected().positional, None)
+
+        state.feed_many(["remote", "-v"])
+        expected = state.expected()
+        self.assert_equal(expected.positional.metavar, "name")
+        self.assert_equal(expected.commands, ["add"])
+        self.assert_equal(
+            expected.options, ["--help", "--verbose", "-h", "-v"]
+        )
+
+        state.feed_many(["origin", "add", "master"])
+        self.assert_equal(state.expected().positional.metavar, "branch")
+
+    def test_fork(self):
+        state = create_tree().create_parser_state()
+        state.feed_many(["-n", "1"])
+        fork = state.fork()
+        fork.feed_many(["-n", "2", "remote", "origin"])
+        state.feed_many(["-n", "3"])
+        self.assert_equal(state.finish(), ((), [], {"numbers": [1, 3]}))
+        self.assert_equal(
+            fork.finish(), (("remote", ), ["origin"], {"numbers": [1, 2]})
+        )
+
+    def test_defaults(self):
+        state = create_tree().create_parser_state(["a"], {"numbers": [0]})
+        state.feed_many(["-n", "1", "repeat", "2"])
+        self.assert_equal(
+            state.finish(), (("repeat", ), ["a", 2], {"numbers": [0, 1]})
+        )
+
+    def test_help(self):
+        stringio = StringIO()
+        def exit(code=0):
+            assert code == 0
+        cli = TestCLI(
+            application_name=u("app"),
+            stdout=stringio,
+            stderr=stringio,
+            exit=exit,
+            options=[("foo", Option("-o", Integer()))]
+        )
+        state = cli.create_parser_state()
+        state.feed("-h")
+        self.assert_equal(stringio.getvalue(), u(""))
+        state.finish()
+        self.assert_true(stringio.getvalue().startswith(u("Usage: app")))
+
+    def test_work_per_argument(self):
+        command = TestCommand(
+            options=[("foo", Option("-f", CountingInteger(),
+                                    action=append_to_list))],
+            positionals=[String(metavar="rest", optional=True, remaining=True)]
+        )
+        state = command.create_parser_state()
+        CountingInteger.parsed = 0
+        for i in range(100):
+            state.feed_many(["-f", str(i)])
+        # the pending option is parsed again for the next argument only
+        self.assert_true(CountingInteger.parsed <= 300)
+        self.assert_equal(state.finish(), ((), [], {"foo": list(range(100))}))
+        state.feed_many(["a", "b", "-f"])
+        self.assert_equal(state.finish()[1], ["a", "b", "-f"])
+
+    def test_remaining_work_per_argument(self):
+        for signature in [
+            {"positionals": [
+                CountingConversions(metavar="numbers", remaining=True)
+            ]},
+            {"options": [("numbers", Option(
+                "-n", CountingConversions(remaining=True)
+            ))]}
+        ]:
+            command = TestCommand(**signature)
+            for count in [1000, 2000]:
+                state = command.create_parser_state()
+                if "options" in signature:
+                    state.feed("-n")
+                CountingConversions.converted = 0
+                for i in range(count):
+                    state.feed(str(i))
+                # each argument is converted once as it is fed
+                self.assert_equal(CountingConversions.converted, count)
+                with self.assert_raises(UserTypeError):
+                    state.feed("foo")
+                fork = state.fork()
+                fork.feed("-1")
+                state.feed("-2")
+                _, args, kwargs = state.finish()
+                numbers = args or kwargs["numbers"]
+                self.assert_equal(numbers, list(range(count)) + [-2])
+                _, args, kwargs = fork.finish()
+                numbers = args or kwargs["numbers"]
+                self.assert_equal(numbers, list(range(count)) + [-1])
+
+
+suite = make_suite([ParserStateTestCase])
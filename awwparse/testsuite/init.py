@@ -6,20 +6,41 @@
     :copyright: 2012 by Daniel Neuhäuser
     :license: BSD, see LICENSE.rst for details
 """
+import os
+import sys
+import subprocess
+import threading
+
 from six import u, StringIO
 
-from awwparse import Option, Command, Arguments, CLI, Integer, String
+import awwparse
+from awwparse import (
+    Option, Command, Arguments, CLI, Integer, String, LazyCommand, File,
+    Boolean, append_to_list, ResponseFiles
+)
+from awwparse import BoundedArguments
 from awwparse.utils import missing
 from awwparse.exceptions import (
     ArgumentMissing, CommandMissing, OptionConflict, CommandConflict,
     UnexpectedArgument, PositionalArgumentMissing, UserTypeError,
-    PositionalConflict
+    PositionalConflict, ResponseFileError, AmbiguousArgument, EndOptionParsing,
+    HelpRequested
 )
 from awwparse.testsuite import (
-    TestCase, make_suite, py3test, TestCommand, TestCLI
+    TestCase, make_suite, py3test, TestCommand, TestCLI, get_test_file_path,
+    file_cleaner
 )
 
 
+class RepeatedOption(Option):
+    # matches -vv, -vvv and so on in addition to the names
+    def matches(self, argument):
+        if (len(argument) > 2 and self.short is not None and
+                set(argument[1:]) == set(self.short[1])):
+            return True, ""
+        return Option.matches(self, argument)
+
+
 class OptionTestCase(TestCase):
     def test_signature(self):
         command = TestCommand(
@@ -71,6 +92,33 @@ class OptionTestCase(TestCase):
         self.assert_equal(option.matches("-o"), (True, ""))
         self.assert_equal(option.matches("--asd"), (False, "--asd"))
         self.assert_equal(option.matches("--option"), (True, ""))
+        self.assert_equal(option.matches("-oo"), (True, "-o"))
+
+    def test_optional_positionals(self):
+        command = TestCommand(options=[
+            ("foo", Option("-a", String(), [String(), String()])),
+            ("bar", Option("-b", String()))
+        ])
+        self.assert_equal(
+            command.run(["-a", "spam", "-b", "eggs", "-a", "x", "y", "z"]),
+            ((), {"foo": [u("x"), u("y"), u("z")], "bar": u("eggs")})
+        )
+        self.assert_equal(
+            command.run(["-b", "eggs", "-a", "spam"]),
+            ((), {"foo": [u("spam")], "bar": u("eggs")})
+        )
+
+        class EndingString(String):
+            def parse(self, command, arguments):
+                raise EndOptionParsing()
+
+        command = TestCommand(options=[
+            ("foo", Option("-a", String(), EndingString(optional=True)))
+        ])
+        self.assert_equal(
+            command.run(["-a", "spam"]),
+            ((), {"foo": [u("spam")]})
+        )
 
     def test_repr(self):
         self.assert_true(
@@ -181,6 +229,48 @@ class CommandTestCase(TestCase):
         self.assert_not_in(None, command.option_shorts)
         self.assert_not_in(None, command.option_longs)
 
+    def test_dispatch_index(self):
+        command = Command()
+        index = command.dispatch_index
+        self.assert_is(command.dispatch_index, index)
+        self.assert_in("-h", index.matches)
+
+        command.add_option("foo", Option("-a", "--abc", String()))
+        self.assert_is_not(command.dispatch_index, index)
+        self.assert_equal(command.get_match("-a")[0], "foo")
+        self.assert_equal(command.get_match("--abc")[0], "foo")
+
+        subcommand = Command()
+        command.add_command("-a", subcommand)
+        self.assert_is(command.get_match("-a")[1], subcommand)
+
+        option = command.option_longs["--abc"]
+        command.remove_option(option)
+        self.assert_false(command.is_option("--abc"))
+
+    def test_abbreviated_longs(self):
+        class AbbreviatingCommand(TestCommand):
+            allow_abbreviated_longs = True
+            options = [
+                ("verbose", Option("--verbose", Integer())),
+                ("version", Option("--version", Integer())),
+                ("verb", Option("--verb", Integer())),
+                ("quiet", Option("-q", "--quiet", Integer()))
+            ]
+            positionals = [String(metavar="foo", optional=True)]
+
+        command = AbbreviatingCommand()
+        self.assert_equal(command.run(["--q", "1"]), ((), {"quiet": 1}))
+        self.assert_equal(command.run(["--verbo", "1"]), ((), {"verbose": 1}))
+        self.assert_equal(command.run(["--verb", "1"]), ((), {"verb": 1}))
+        with self.assert_raises(AmbiguousArgument):
+            command.run(["--ver", "1"], passthrough_errors=True)
+        self.assert_equal(command.run(["--"]), ((u("--"), ), {}))
+
+        command = TestCommand(options=[("quiet", Option("--quiet", Integer()))])
+        with self.assert_raises(UnexpectedArgument):
+            command.run(["--q", "1"], passthrough_errors=True)
+
     def test_get_usage(self):
         command = Command()
         command.add_option("foo", Option("-o", String()))
@@ -192,6 +282,78 @@ class CommandTestCase(TestCase):
         command.add_positional(String(metavar="baz"))
         self.assert_equal(command.get_usage(), u("[-h] [-o foo] {bar} baz"))
 
+    def test_shared_options(self):
+        verbose = Option("-v", "--verbose", Integer())
+        region = Option("-r", "--region", String(metavar=u("name")))
+        commands = [
+            Command(options=[("verbose", verbose), ("region", region)])
+            for _ in range(3)
+        ]
+        shared = [
+            command.option_longs["--verbose"].positionals[0]
+            for command in commands
+        ]
+        self.assert_true(all(
+            positional is shared[0] for positional in shared
+        ))
+        self.assert_is_not(shared[0], verbose.positionals[0])
+        self.assert_equal(shared[0].metavar, u("verbose"))
+        self.assert_is(verbose.positionals[0].metavar, None)
+        for command in commands:
+            option = command.option_longs["--region"]
+            self.assert_is_not(option, region)
+            self.assert_is(option.positionals[0], region.positionals[0])
+
+        other = Command(options=[("level", verbose)])
+        self.assert_equal(
+            other.option_longs["--verbose"].positionals[0].metavar, u("level")
+        )
+
+        command = Command(options=[("foo", Option("-r", String()))])
+        command.add_option("region", region, resolve_conflicts=True)
+        resolved = command.option_longs["--region"]
+        self.assert_is(resolved.short, None)
+        self.assert_equal(region.short, "-r")
+        self.assert_is(resolved.positionals[0], region.positionals[0])
+
+    def test_shared_options_changed(self):
+        verbose = Option("-v", Integer())
+        first = Command(options=[("verbose", verbose)])
+        verbose.help = u("Be verbose")
+        verbose.action = append_to_list
+        second = Command(options=[("verbose", verbose)])
+        changed = second.option_shorts["-v"]
+        self.assert_is_not(changed, first.option_shorts["-v"])
+        self.assert_equal(changed.help, u("Be verbose"))
+        self.assert_is(changed.action, append_to_list)
+        self.assert_is(first.option_shorts["-v"].help, None)
+
+        verbose.positionals.append(Integer(optional=True))
+        third = Command(options=[("verbose", verbose)])
+        self.assert_equal(len(third.option_shorts["-v"].positionals), 2)
+        fourth = Command(options=[("verbose", verbose)])
+        self.assert_equal(
+            fourth.option_shorts["-v"].positionals,
+            third.option_shorts["-v"].positionals
+        )
+
+        verbose.positionals[0].help = u("The level")
+        fifth = Command(options=[("verbose", verbose)])
+        self.assert_equal(
+            fifth.option_shorts["-v"].positionals[0].help, u("The level")
+        )
+        self.assert_is(third.option_shorts["-v"].positionals[0].help, None)
+
+    def test_changing_added_options(self):
+        option = Option("-a", Integer(metavar=u("n")))
+        first = TestCommand(options=[("a", option)])
+        second = TestCommand(options=[("a", option)])
+        first.option_shorts["-a"].action = append_to_list
+        self.assert_equal(first.parse(["-a", "1"]), ((), [], {"a": [1]}))
+        self.assert_equal(second.parse(["-a", "1"]), ((), [], {"a": 1}))
+        option.action = append_to_list
+        self.assert_equal(second.parse(["-a", "1"]), ((), [], {"a": 1}))
+
     def test_add_option(self):
         command = Command()
         a = Option("-a", "--foobar", String())
@@ -234,6 +396,52 @@ class CommandTestCase(TestCase):
             Option("-a", "--asd", String()),
             force=True
         )
+        # replaces an option conflicting on both names
+        command.add_option("qux", Option("-a", "--asd", String()), force=True)
+        self.assert_equal(command.options[command.option_shorts["-a"]], "qux")
+
+    def test_add_options(self):
+        command = Command()
+        command.add_options([
+            ("foo", Option("-a", "--foo", String())),
+            ("bar", Option("-b", "--bar", String()))
+        ])
+        options = list(command.options)
+        with self.assert_raises(OptionConflict):
+            command.add_options([
+                ("baz", Option("-c", String())),
+                ("spam", Option("-c", String()))
+            ])
+        with self.assert_raises(OptionConflict):
+            command.add_options([
+                ("baz", Option("-d", String())),
+                ("spam", Option("--foo", String()))
+            ])
+        # nothing is added if there is a conflict
+        self.assert_equal(list(command.options), options)
+        self.assert_not_in("-c", command.option_shorts)
+        self.assert_not_in("-d", command.option_shorts)
+
+        command.add_options([
+            ("baz", Option("-c", String())),
+            ("spam", Option("-c", "--spam", String())),
+            ("eggs", Option("-a", String()))
+        ], force=True)
+        self.assert_equal(
+            list(command.options.values()),
+            ["__awwparse_help", "bar", "spam", "eggs"]
+        )
+        self.assert_equal(
+            sorted(command.option_shorts), ["-a", "-b", "-c", "-h"]
+        )
+        self.assert_equal(
+            sorted(command.option_longs), ["--bar", "--help", "--spam"]
+        )
+
+        command.remove_option(command.option_shorts["-c"])
+        self.assert_not_in("-c", command.option_shorts)
+        self.assert_not_in("--spam", command.option_longs)
+        self.assert_not_in("--spam", command.dispatch_index.longs)
 
     def test_multiple_options_for_name(self):
         command = TestCommand(
@@ -254,6 +462,323 @@ class CommandTestCase(TestCase):
         with self.assert_raises(CommandConflict):
             command.add_command("foobar", Command())
 
+    def test_lazy_command(self):
+        command = Command()
+        command.add_command("foo", "awwparse.testsuite:TestCommand")
+        command.add_command("bar", LazyCommand(
+            "awwparse.testsuite:TestCommand", help=u("Does bar")
+        ))
+        self.assert_is_instance(command.commands["foo"], LazyCommand)
+        self.assert_equal(command.commands["bar"].help, u("Does bar"))
+        self.assert_equal(command.get_usage(), u("[-h] {foo,bar}"))
+
+        name, match, _ = command.get_match("foo")
+        self.assert_is_instance(match, TestCommand)
+        self.assert_is(match.parent, command)
+        self.assert_is(command.commands["foo"], match)
+        self.assert_is_instance(command.commands["bar"], LazyCommand)
+        self.assert_is(command.load_command("foo"), match)
+
+        with self.assert_raises(ValueError):
+            command.add_command("baz", "awwparse.testsuite.TestCommand")
+        command.add_command("baz", "awwparse.testsuite:DoesNotExist")
+        with self.assert_raises(ImportError):
+            command.get_match("baz")
+
+    def test_command_paths(self):
+        root = Command()
+        db = Command()
+        replica = Command()
+        promote = TestCommand()
+        root.add_command("db", db)
+        db.add_command("replica", replica)
+        self.assert_equal(
+            root.command_paths,
+            {(): root, ("db", ): db, ("db", "replica"): replica}
+        )
+        replica.add_command("promote", promote)
+        self.assert_is(root.get_command(["db", "replica", "promote"]), promote)
+        self.assert_is(db.get_command(("replica", "promote")), promote)
+        self.assert_is(root.get_command(()), root)
+
+        replica.add_command("lazy", "awwparse.testsuite:TestCommand")
+        lazy = root.get_command(("db", "replica", "lazy"))
+        self.assert_is_instance(lazy, TestCommand)
+        self.assert_is(replica.commands["lazy"], lazy)
+        self.assert_is(root.command_paths[("db", "replica", "lazy")], lazy)
+
+        with self.assert_raises(KeyError):
+            root.get_command(("db", "spam"))
+
+        shared = Command()
+        first, second = Command(), Command()
+        first.add_command("s", shared)
+        second.add_command("s", shared)
+        self.assert_equal(set(first.command_paths), set([(), ("s", )]))
+        self.assert_equal(set(second.command_paths), set([(), ("s", )]))
+        leaf = TestCommand()
+        shared.add_command("leaf", leaf)
+        self.assert_is(first.command_paths[("s", "leaf")], leaf)
+        self.assert_is(second.command_paths[("s", "leaf")], leaf)
+        self.assert_is(first.get_command(("s", "leaf")), leaf)
+
+    def test_deep_command_tree(self):
+        depth = sys.getrecursionlimit() + 100
+        root = command = Command()
+        for _ in range(depth):
+            subcommand = Command()
+            command.add_command("sub", subcommand)
+            command = subcommand
+        leaf = TestCommand()
+        command.add_command("leaf", leaf)
+        path = ("sub", ) * depth + ("leaf", )
+        self.assert_equal(root.parse(list(path)), (path, [], {}))
+        self.assert_equal(leaf.run([]), ((), {}))
+
+    def test_template(self):
+        class A(TestCommand):
+            options = [("foo", Option("-a", String()))]
+            positionals = [String(metavar="bar")]
+
+            @Command.from_method(Integer())
+            def sub(self, baz):
+                return self, baz
+
+        first, second = A(), A()
+        self.assert_is_not(first.options, second.options)
+        self.assert_equal(
+            list(map(repr, first.options)), list(map(repr, second.options))
+        )
+        self.assert_true(all(
+            option not in second.options for option in first.options
+        ))
+        self.assert_equal(
+            repr(first.positionals[0]), repr(second.positionals[0])
+        )
+        self.assert_is_not(first.positionals[0], second.positionals[0])
+        second.add_option("spam", Option("-b", String()))
+        self.assert_equal(len(first.options), 2)
+        self.assert_equal(second.run(["-a", "x", "y"]), (
+            (u("y"), ), {"foo": u("x")}
+        ))
+        self.assert_equal(first.run(["sub", "1"]), (first, 1))
+        self.assert_equal(second.run(["sub", "1"]), (second, 1))
+        self.assert_is(second.commands["sub"].parent, second)
+
+        class B(A):
+            options = [("spam", Option("-c", String()))]
+
+        self.assert_equal(
+            sorted(B().options.values()), ["__awwparse_help", "spam"]
+        )
+        self.assert_equal(len(A().options), 2)
+
+        with_arguments = A(options=[("eggs", Option("-e", String()))])
+        self.assert_equal(len(with_arguments.options), 3)
+
+        A.options = [("eggs", Option("-e", String()))]
+        self.assert_equal(
+            sorted(A().options.values()), ["__awwparse_help", "eggs"]
+        )
+        A.options.append(("ham", Option("-f", String())))
+        self.assert_equal(
+            sorted(A().options.values()), ["__awwparse_help", "eggs", "ham"]
+        )
+        A.positionals = [String(metavar="bar"), String(metavar="baz")]
+        self.assert_equal(len(A().positionals), 2)
+        A.main = lambda self, bar, baz, **kwargs: (bar, baz)
+        self.assert_equal(
+            A().run(["-e", "x", "y", "z"]), (u("y"), u("z"))
+        )
+        A.other = Command()
+        self.assert_in("other", A().commands)
+
+    def test_copy(self):
+        command = TestCommand(
+            options=[("foo", Option("-a", Integer()))],
+            commands={"sub": TestCommand(), "lazy": "awwparse:Command"},
+            positionals=[Integer(metavar=u("bar"), optional=True)]
+        )
+        copied = command.copy()
+        self.assert_is_not(copied.positionals[0], command.positionals[0])
+        self.assert_is(copied.commands["sub"].parent, copied)
+        self.assert_is_not(copied.commands["sub"], command.commands["sub"])
+        self.assert_is(copied.commands["lazy"].parent, copied)
+        copied.add_option("spam", Option("-b", Integer()))
+        copied.option_shorts["-a"].action = append_to_list
+        self.assert_equal(
+            copied.parse(["-a", "1", "-b", "2"]),
+            ((), [], {"foo": [1], "spam": 2})
+        )
+        self.assert_equal(command.parse(["-a", "1"]), ((), [], {"foo": 1}))
+        self.assert_not_in("-b", command.option_shorts)
+
+        command.freeze()
+        self.assert_false(command.copy().frozen)
+
+        class Root(TestCommand):
+            @Command.from_method()
+            def sub(self, **kwargs):
+                return self, kwargs
+
+        Root.sub.add_option("n", Option("-n", Integer()))
+        root = Root()
+        self.assert_equal(root.run(["sub", "-n", "1"]), (root, {"n": 1}))
+
+    def test_adaptive_matching(self):
+        class AdaptiveCommand(Command):
+            adaptive_matching = True
+            adaptive_matching_interval = 3
+            options = [
+                ("verbose", RepeatedOption("-v", Boolean())),
+                ("quiet", RepeatedOption("-q", "--quiet", Boolean()))
+            ]
+        command = AdaptiveCommand()
+        verbose = command.option_shorts["-v"]
+        quiet = command.option_shorts["-q"]
+        index = command.dispatch_index
+        self.assert_equal(index.scan_order[1:], [verbose, quiet])
+
+        for _ in range(3):
+            self.assert_equal(
+                command.get_match("-qq"), ("quiet", quiet, "")
+            )
+        # exact names are not counted
+        command.get_match("-v")
+        self.assert_equal(command.match_counts, {"--quiet": 3})
+        self.assert_equal(index.scan_order[0], quiet)
+
+        command.set_match_counts({"-v": 10, "--spam": 1})
+        self.assert_equal(command.match_counts, {"-v": 10, "--quiet": 3})
+        self.assert_equal(
+            command.dispatch_index.scan_order[:2], [verbose, quiet]
+        )
+        self.assert_equal(command.get_match("-vvv"), ("verbose", verbose, ""))
+
+        command.remove_option(quiet)
+        self.assert_equal(command.match_counts, {"-v": 11})
+
+        command = Command(
+            options=[("verbose", RepeatedOption("-v", Boolean()))]
+        )
+        command.get_match("-vv")
+        self.assert_equal(command.match_counts, {})
+
+        command = AdaptiveCommand()
+        command.set_match_counts({"--quiet": 1})
+        command.freeze()
+        index = command.dispatch_index
+        scan_order = index.scan_order
+        for _ in range(3):
+            command.get_match("-vv")
+        self.assert_equal(command.match_counts, {"--quiet": 1})
+        self.assert_is(command.dispatch_index, index)
+        self.assert_is(index.scan_order, scan_order)
+        with self.assert_raises(TypeError):
+            command.set_match_counts({"-v": 10})
+        self.assert_equal(command.match_counts, {"--quiet": 1})
+        self.assert_is(command.dispatch_index, index)
+
+    def test_freeze(self):
+        command = TestCommand(
+            options=[("foo", Option("-a", String()))],
+            positionals=[String(metavar="bar", optional=True)]
+        )
+        command.add_command("lazy", "awwparse.testsuite:TestCommand")
+        self.assert_is(command.freeze(), command)
+        self.assert_true(command.frozen)
+        lazy = command.commands["lazy"]
+        self.assert_is_instance(lazy, TestCommand)
+        self.assert_true(lazy.frozen)
+        self.assert_is(command.get_command(["lazy"]), lazy)
+        with self.assert_raises(TypeError):
+            command.add_option("spam", Option("-b", String()))
+        with self.assert_raises(TypeError):
+            command.remove_option(list(command.options)[0])
+        with self.assert_raises(TypeError):
+            command.add_command("spam", Command())
+        with self.assert_raises(TypeError):
+            lazy.add_positional(String(metavar="spam"))
+        with self.assert_raises(AttributeError):
+            command.positionals.append(String(metavar="spam"))
+        with self.assert_raises(TypeError):
+            command.commands["spam"] = Command()
+        with self.assert_raises(TypeError):
+            del command.commands["lazy"]
+        with self.assert_raises(TypeError):
+            command.options[Option("-b", String())] = "spam"
+        self.assert_equal(list(command.commands), ["lazy"])
+        self.assert_equal(
+            command.parse(["-a", "x", "y", "lazy"]),
+            (("lazy", ), [u("y")], {"foo": u("x")})
+        )
+        self.assert_false(TestCommand().frozen)
+
+    def test_concurrent_parsing(self):
+        class Sub(TestCommand):
+            options = [("n", Option("-n", Integer(), action=append_to_list))]
+            positionals = [String(metavar="name")]
+
+        class Root(TestCommand):
+            parse_cache_size = 8
+            allow_abbreviated_longs = True
+            options = [
+                ("verbose", Option("-v", "--verbose", Boolean())),
+                ("level", Option("-l", "--level", Integer()))
+            ]
+            commands = {
+                "sub": Sub(),
+                "lazy": "awwparse.testsuite:TestCommand"
+            }
+
+        command = Root().freeze()
+        argument_vectors = [
+            ["-v"], ["--lev", "1"], ["sub", "-n", "1", "-n", "2", "x"],
+            ["-vl", "3", "sub", "y"], ["lazy"]
+        ]
+        expected = [
+            ((), [], {"verbose": True}),
+            ((), [], {"level": 1}),
+            (("sub", ), [u("x")], {"n": [1, 2]}),
+            (("sub", ), [u("y")], {"verbose": True, "level": 3}),
+            (("lazy", ), [], {})
+        ]
+        errors = []
+        def parse(thread):
+            try:
+                for i in range(200):
+                    for arguments, result in zip(argument_vectors, expected):
+                        if command.parse(arguments) != result:
+                            errors.append((arguments, result))
+                    # a varying argument vector evicts cached results
+                    arguments = ["sub", "z", "-n", str(i)]
+                    if command.run(arguments) != ((u("z"), ), {"n": [i]}):
+                        errors.append(arguments)
+            except Exception as error:
+                errors.append(error)
+        # switching threads as often as possible provokes races
+        if hasattr(sys, "setswitchinterval"):
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+        else:
+            switch_interval = sys.getcheckinterval()
+            sys.setcheckinterval(1)
+        try:
+            threads = [
+                threading.Thread(target=parse, args=(i, )) for i in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if hasattr(sys, "setswitchinterval"):
+                sys.setswitchinterval(switch_interval)
+            else:
+                sys.setcheckinterval(switch_interval)
+        self.assert_equal(errors, [])
+        self.assert_true(command.parse_cache.evictions > 0)
+
     def test_add_positional(self):
         command = Command()
         with self.assert_raises(ValueError):
@@ -285,6 +810,126 @@ class CommandTestCase(TestCase):
         with self.assert_raises(UnexpectedArgument):
             command.run(["-a"], passthrough_errors=True)
 
+    def test_parse(self):
+        class A(Command):
+            options = [("bar", Option("-b", Integer()))]
+
+            def main(self, **kwargs):
+                raise AssertionError("main should not be called")
+
+        class B(Command):
+            options = [("foo", Option("-a", String()))]
+            commands = {"spam": A()}
+
+        command = B()
+        self.assert_equal(
+            command.parse(["-a", "foo"]),
+            ((), [], {"foo": u("foo")})
+        )
+        self.assert_equal(
+            command.parse(["-a", "foo", "spam", "-b", "1"]),
+            (("spam", ), [], {"foo": u("foo"), "bar": 1})
+        )
+        with self.assert_raises(UserTypeError):
+            command.parse(["spam", "-b", "foo"], passthrough_errors=True)
+
+    def test_parse_many(self):
+        class A(Command):
+            positionals = Integer(metavar="a")
+
+        class B(Command):
+            options = [("foo", Option("-a", String()))]
+            commands = {"spam": A()}
+
+        default_args = ["x"]
+        results = B().parse_many(
+            [["-a", "foo"], ["spam", "1"], ["spam", "foo"], ["eggs"]],
+            default_args=default_args
+        )
+        self.assert_equal(results[:2], [
+            ((), ["x"], {"foo": u("foo")}),
+            (("spam", ), ["x", 1], {})
+        ])
+        self.assert_is_instance(results[2], UserTypeError)
+        self.assert_is_instance(results[3], UnexpectedArgument)
+        self.assert_equal(default_args, ["x"])
+
+        stringio = StringIO()
+        def exit(code=0):
+            raise AssertionError("exit should not be called")
+        cli = TestCLI(
+            stdout=stringio, stderr=stringio, exit=exit,
+            commands={"spam": A()}
+        )
+        results = cli.parse_many([["-h"], ["spam", "--help"], ["spam", "1"]])
+        self.assert_is_instance(results[0], HelpRequested)
+        self.assert_is(results[0].command, cli)
+        self.assert_is_instance(results[1], HelpRequested)
+        self.assert_is(results[1].command, cli.commands["spam"])
+        self.assert_equal(results[2], (("spam", ), [1], {}))
+        self.assert_equal(stringio.getvalue(), u(""))
+        results[1].command.print_help(results[1].arguments)
+        self.assert_true(stringio.getvalue().startswith(u("Usage: ")))
+
+    def test_parse_cache(self):
+        class TestCommand(Command):
+            parse_cache_size = 2
+            options = [
+                ("foo", Option("-a", Integer(), action=append_to_list)),
+                ("bar", Option("-b", File()))
+            ]
+
+        command = TestCommand()
+        self.assert_is(Command().parse_cache, None)
+        self.assert_equal(command.parse_cache.maxsize, 2)
+
+        first = command.parse(["-a", "1", "-a", "2"])
+        self.assert_equal(first, ((), [], {"foo": [1, 2]}))
+        first[2]["foo"].append(3)
+        self.assert_equal(
+            command.parse(("-a", "1", "-a", "2")),
+            ((), [], {"foo": [1, 2]})
+        )
+        self.assert_equal(command.parse_cache.hits, 1)
+
+        command.parse(["-b", "foo"])
+        self.assert_equal(len(command.parse_cache), 1)
+        command.add_option(
+            "baz", Option("-c", Integer(remaining=True, stream=True))
+        )
+        self.assert_equal(len(command.parse_cache), 0)
+        command.parse(["-c", "1"])
+        command.parse(iter(["-a", "1"]))
+        command.parse(["-a", "1"], default_args=[])
+        self.assert_equal(len(command.parse_cache), 0)
+
+        command.parse(["-a", "3"])
+        command.parse(["-a", "4"])
+        command.parse(["-a", "5"])
+        self.assert_equal(command.parse_cache.evictions, 1)
+
+    def test_parse_cache_invalidation(self):
+        class CachingCommand(TestCommand):
+            parse_cache_size = 8
+
+        command = CachingCommand(
+            options=[("z", Option("-z", Integer()))],
+            positionals=[String(metavar=u("a"), optional=True)]
+        )
+        self.assert_equal(command.parse(["sub"]), ((), [u("sub")], {}))
+        command.add_command("sub", TestCommand())
+        self.assert_equal(command.parse(["sub"]), (("sub", ), [], {}))
+
+        self.assert_equal(command.parse(["-z", "1"]), ((), [], {"z": 1}))
+        command.remove_option(command.option_shorts["-z"])
+        with self.assert_raises(UnexpectedArgument):
+            command.parse(["-z", "1"], passthrough_errors=True)
+
+        # changes below the command invalidate its cache as well
+        command.commands["sub"].add_positional(String(metavar=u("b")))
+        with self.assert_raises(PositionalArgumentMissing):
+            command.parse(["sub"], passthrough_errors=True)
+
     def test_main(self):
         class TestCommand(Command):
             options = {
@@ -310,6 +955,46 @@ class CommandTestCase(TestCase):
             ((), {"a": u("foo"), "b": u("bar"), "c": u("baz")})
         )
 
+    def test_clusters(self):
+        command = TestCommand(
+            options=[
+                ("verbose", Option("-v", Boolean(), action=append_to_list)),
+                ("a", Option("-a", Integer())),
+                ("b", Option("-b", String()))
+            ],
+            positionals=[String(metavar="foo", optional=True)]
+        )
+        self.assert_equal(
+            command.run(["-" + "v" * 30]), ((), {"verbose": [True] * 30})
+        )
+        self.assert_equal(
+            command.run(["-avb", "1", "foo"]),
+            ((), {"a": 1, "verbose": [True], "b": u("foo")})
+        )
+        self.assert_equal(
+            [name for name, _ in command.get_matches("-bva")],
+            ["b", "verbose", "a"]
+        )
+        self.assert_equal(command.run(["-vx"]), ((u("-vx"), ), {}))
+        with self.assert_raises(UnexpectedArgument):
+            command.get_matches("-vx")
+
+        # names take precedence over clusters
+        command = TestCommand(options=[
+            ("f", Option("-f", Boolean())),
+            ("o", Option("-o", Boolean())),
+            ("foo", Option("-foo", Integer()))
+        ])
+        self.assert_equal(command.get_match("-foo")[0], "foo")
+        self.assert_equal(
+            [name for name, _ in command.get_matches("-foo")], ["foo"]
+        )
+        for parser in [command, command.compile()]:
+            self.assert_equal(parser.run(["-foo", "3"]), ((), {"foo": 3}))
+            self.assert_equal(
+                parser.run(["-ofo"]), ((), {"o": True, "f": True})
+            )
+
     def test_subcommands(self):
         results = []
         class A(Command):
@@ -374,11 +1059,87 @@ class ArgumentsTestCase(TestCase):
         arguments.rewind()
         self.assert_equal(arguments.trace, [[]])
         self.assert_equal(arguments.next(), "foo")
+        self.assert_equal(arguments.next(), "bar")
+        arguments.rewind()
+        arguments.rewind()
+        self.assert_equal(list(arguments), ["foo", "bar"])
+        arguments.begin_frame()
+        with self.assert_raises(IndexError):
+            arguments.rewind()
+
+    def test_frames(self):
+        arguments = Arguments(("foo", "bar", "baz", "spam"), "app")
+        self.assert_equal(arguments.trace, [["app"], []])
+        arguments.next()
+        arguments.begin_frame()
+        arguments.next()
+        arguments.next()
+        arguments.begin_frame()
+        self.assert_equal(
+            arguments.trace, [["app"], ["foo"], ["bar", "baz"], []]
+        )
+        self.assert_equal(arguments.current_frame, [])
+        self.assert_equal(arguments.get_used(), ["app", "foo", "bar", "baz"])
+        self.assert_equal(arguments.get_used(1), ["app", "foo", "bar", "baz"])
+        self.assert_equal(arguments.get_used(2), ["app", "foo"])
+        self.assert_equal(arguments.get_used(3), ["app"])
+        self.assert_equal(arguments.get_used(4), [])
+        self.assert_equal(arguments.get_used(5), [])
+
+    def test_iterator(self):
+        consumed = []
+        def generate():
+            for argument in ["foo", "bar", "baz"]:
+                consumed.append(argument)
+                yield argument
+        arguments = Arguments(generate())
+        self.assert_equal(arguments.next(), "foo")
+        self.assert_equal(consumed, ["foo"])
+        self.assert_equal(arguments.peek(), "bar")
+        self.assert_equal(consumed, ["foo", "bar"])
+        arguments.rewind()
+        self.assert_equal(list(arguments), ["foo", "bar", "baz"])
+        self.assert_is(arguments.peek(), missing)
+        self.assert_equal(arguments.get_used(), ["foo", "bar", "baz"])
+
+    def test_peek(self):
+        arguments = Arguments(["foo", "bar"])
+        self.assert_equal(arguments.peek(), "foo")
+        self.assert_equal(arguments.trace, [[]])
+        self.assert_equal(arguments.next(), "foo")
+        self.assert_equal(arguments.next(), "bar")
+        self.assert_is(arguments.peek(), missing)
 
     def test_nonzero(self):
         self.assert_true(Arguments([1]))
         self.assert_false(Arguments([]))
 
+    def test_bounded(self):
+        arguments = BoundedArguments(
+            (str(i) for i in range(100)), "app", trace_size=2
+        )
+        for _ in range(10):
+            arguments.next()
+        arguments.begin_frame()
+        for _ in range(20):
+            arguments.next()
+        arguments.rewind()
+        self.assert_equal(arguments.peek(), "29")
+        arguments.begin_frame()
+        self.assert_equal(arguments.trace, [["app"], ["9"], ["27", "28"], []])
+        self.assert_equal(arguments.get_used(1), ["app", "9", "27", "28"])
+        self.assert_equal(arguments.get_used(2), ["app", "9"])
+        self.assert_equal(len(list(arguments)), 71)
+        self.assert_equal(arguments.current_frame, ["98", "99"])
+
+        arguments = BoundedArguments(["foo", "bar"], trace_size=0)
+        arguments.next()
+        arguments.begin_frame()
+        arguments.next()
+        arguments.rewind()
+        self.assert_equal(arguments.next(), "bar")
+        self.assert_equal(arguments.trace, [["foo"], []])
+
     def test_repr(self):
         args = iter(["foo", "bar"])
         arguments = Arguments(args)
@@ -393,6 +1154,131 @@ class ArgumentsTestCase(TestCase):
         )
 
 
+class ResponseFilesTestCase(TestCase):
+    def write(self, path, content):
+        with open(path, "wb") as file:
+            file.write(content.encode("utf-8"))
+
+    def test_expand(self):
+        outer, inner = paths = [
+            get_test_file_path("awwparse.testsuite.init.ResponseFiles" + name)
+            for name in ["outer", "inner"]
+        ]
+        with file_cleaner(paths):
+            self.write(outer, u("b\n@{0}\n\ne\n").format(inner))
+            self.write(inner, u("c\nd"))
+            response_files = ResponseFiles(buffer_size=3)
+            self.assert_equal(
+                list(response_files.expand(["a", "@" + outer, "f", "@"])),
+                ["a", "b", "c", "d", "e", "f", "@"]
+            )
+
+            self.write(inner, u("c\n@{0}\n").format(outer))
+            with self.assert_raises(ResponseFileError):
+                list(response_files.expand(["@" + outer]))
+
+    def test_delimiter(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            self.write(path, u("a b\0c\nd\0"))
+            self.assert_equal(
+                list(ResponseFiles(delimiter="\0").expand(["@" + path])),
+                ["a b", "c\nd"]
+            )
+
+    def test_carriage_returns(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            self.write(path, u("a\rb\0c\r\nd\0"))
+            self.assert_equal(
+                list(ResponseFiles(delimiter="\0").expand(["@" + path])),
+                ["a\rb", "c\r\nd"]
+            )
+            self.write(path, u("a\rb\r\nc\nd\r\n"))
+            for buffer_size in [1, 2, 3, 2 ** 16]:
+                response_files = ResponseFiles(buffer_size=buffer_size)
+                self.assert_equal(
+                    list(response_files.expand(["@" + path])),
+                    ["a\rb", "c", "d"]
+                )
+
+    def test_shell_quoted(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            self.write(path, u("a 'b c'\n\"d\" ''\n"))
+            self.assert_equal(
+                list(ResponseFiles(shell_quoted=True).expand(["@" + path])),
+                ["a", "b c", "d", ""]
+            )
+
+    def test_missing(self):
+        with self.assert_raises(ResponseFileError):
+            list(ResponseFiles().expand(["@does-not-exist"]))
+
+    def test_unterminated_quote(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            self.write(path, u("a 'b\n"))
+            with self.assert_raises(ResponseFileError):
+                list(ResponseFiles(shell_quoted=True).expand(["@" + path]))
+
+    def test_undecodable(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            with open(path, "wb") as file:
+                file.write(b"a\n\xff\xfe\n")
+            response_files = ResponseFiles(encoding="utf-8")
+            with self.assert_raises(ResponseFileError):
+                list(response_files.expand(["@" + path]))
+
+            stringio = StringIO()
+            def exit(code):
+                assert code != 1
+            cli = TestCLI(
+                application_name=u("app"),
+                stdout=stringio,
+                stderr=stringio,
+                exit=exit,
+                response_files=response_files
+            )
+            with self.assert_raises(AssertionError):
+                cli.run(["@" + path])
+            self.assert_true(
+                stringio.getvalue().startswith(
+                    u("Error: cannot decode response file")
+                )
+            )
+
+    def test_cli(self):
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            self.write(path, u("-a\n1\n-a\n2\n"))
+            cli = TestCLI(
+                options=[("foo", Option("-a", Integer(), action=append_to_list))],
+                response_files=ResponseFiles()
+            )
+            self.assert_equal(
+                cli.run(["@" + path, "-a", "3"]),
+                ((), {"foo": [1, 2, 3]})
+            )
+            with self.assert_raises(ResponseFileError):
+                cli.run(["@does-not-exist"], passthrough_errors=True)
+
+    def test_parse_cache(self):
+        class CachingCLI(TestCLI):
+            parse_cache_size = 2
+            options = [("foo", Option("-a", Integer()))]
+
+        path = get_test_file_path("awwparse.testsuite.init.ResponseFiles")
+        with file_cleaner([path]):
+            cli = CachingCLI(response_files=ResponseFiles())
+            self.write(path, u("-a\n1\n"))
+            self.assert_equal(cli.parse(["@" + path]), ((), [], {"foo": 1}))
+            self.write(path, u("-a\n2\n"))
+            self.assert_equal(cli.parse(["@" + path]), ((), [], {"foo": 2}))
+            self.assert_equal(len(cli.parse_cache), 0)
+
+
 class CLITestCase(TestCase):
     def test_get_usage(self):
         cli = CLI(
@@ -473,6 +1359,59 @@ class CLITestCase(TestCase):
             "  spam [-h]\n"
         ))
 
+    def test_bounded_trace(self):
+        stringio = StringIO()
+        def exit(code):
+            assert code != 1
+        cli = TestCLI(
+            application_name=u("app"),
+            stdout=stringio,
+            stderr=stringio,
+            exit=exit,
+            width=40,
+            trace_size=4,
+            options=[("verbose", Option("-v", Boolean()))],
+            commands={
+                "spam": Command(
+                    options=[("foo", Option("-o", String()))],
+                    positionals=[String(metavar=u("a"))]
+                )
+            }
+        )
+        self.assert_equal(cli.trace_size, 4)
+        self.assert_equal(TestCLI().trace_size, None)
+
+        trace_lengths = set()
+        def generate():
+            yield "-v"
+            yield "spam"
+            for _ in range(5000):
+                trace_lengths.add(len(arguments.current_frame))
+                yield "-o"
+                yield "x"
+            yield "a"
+            yield "b"
+        arguments = cli.create_arguments(generate())
+        self.assert_is_instance(arguments, BoundedArguments)
+        with self.assert_raises(AssertionError):
+            cli.run(arguments)
+        self.assert_equal(max(trace_lengths), 4)
+        # the option given before the command is no longer known
+        self.assert_equal(
+            stringio.getvalue(),
+            u(
+                "Error: 'b' is unexpected\n"
+                "Usage: app spam [-h] [-o foo] a\n"
+                "\n"
+                "Positional Arguments\n"
+                "  a\n"
+                "\n"
+                "Options\n"
+                "  -h, --help   Show this message\n"
+                "  -o foo\n"
+            )
+        )
+
     def test_error_handling(self):
         stringio = StringIO()
         def exit(code):
@@ -583,6 +1522,35 @@ class CLITestCase(TestCase):
         )
 
 
+class ImportTestCase(TestCase):
+    def test_all(self):
+        for name in awwparse.__all__:
+            self.assert_true(hasattr(awwparse, name), name)
+
+    def test_lazy_imports(self):
+        environment = os.environ.copy()
+        environment["PYTHONPATH"] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(awwparse.__file__))] +
+            environment.get("PYTHONPATH", "").split(os.pathsep)
+        )
+        process = subprocess.Popen(
+            [
+                sys.executable, "-c",
+                "import sys, awwparse; "
+                "print(' '.join(sorted(sys.modules)))"
+            ],
+            stdout=subprocess.PIPE,
+            env=environment
+        )
+        modules = process.communicate()[0].decode("ascii").split()
+        self.assert_equal(process.returncode, 0)
+        self.assert_in("awwparse", modules)
+        for module in ["requests", "urllib.parse", "urlparse", "inspect",
+                       "textwrap", "shlex", "re"]:
+            self.assert_not_in(module, modules)
+
+
 suite = make_suite([
-    OptionTestCase, CommandTestCase, ArgumentsTestCase, CLITestCase
+    OptionTestCase, CommandTestCase, ArgumentsTestCase, CLITestCase,
+    ImportTestCase, ResponseFilesTestCase
 ])
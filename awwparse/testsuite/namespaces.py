@@ -0,0 +1,125 @@
+# coding: utf-8
+"""
+    awwparse.testsuite.namespaces
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import pickle
+from copy import deepcopy
+
+from awwparse import Option, Integer, String, Boolean, append_to_list
+from awwparse.namespaces import Namespace, create_namespace_class
+from awwparse.testsuite import TestCase, TestCommand, make_suite
+
+
+class Tool(TestCommand):
+    use_namespaces = True
+
+    options = [
+        ("verbose", Option("-v", Boolean())),
+        ("numbers", Option("-n", Integer(), action=append_to_list))
+    ]
+
+    commands = {
+        "remote": TestCommand(
+            options=[("url", Option("-u", String()))],
+            positionals=[String(metavar="name")]
+        )
+    }
+
+
+class NamespaceTestCase(TestCase):
+    def test_mapping(self):
+        cls = create_namespace_class(["foo", "bar"])
+        self.assert_true(issubclass(cls, Namespace))
+        self.assert_is(create_namespace_class(("foo", "bar")), cls)
+        self.assert_equal(cls.fields, ("foo", "bar"))
+        self.assert_equal(cls.__slots__, ("foo", "bar"))
+
+        namespace = cls(bar=1)
+        self.assert_equal(namespace.bar, 1)
+        self.assert_equal(namespace.keys(), ["bar"])
+        self.assert_not_in("foo", namespace)
+        self.assert_equal(namespace.get("foo"), None)
+        self.assert_equal(namespace.get("foo", 2), 2)
+        with self.assert_raises(KeyError):
+            namespace["foo"]
+        namespace["foo"] = 2
+        self.assert_equal(namespace.items(), [("foo", 2), ("bar", 1)])
+        self.assert_equal(len(namespace), 2)
+        self.assert_equal(namespace, {"foo": 2, "bar": 1})
+        self.assert_not_equal(namespace, {"foo": 2})
+        self.assert_equal(dict(**namespace), {"foo": 2, "bar": 1})
+        del namespace["foo"]
+        self.assert_equal(list(namespace), ["bar"])
+
+        with self.assert_raises(KeyError):
+            namespace["spam"] = 1
+        with self.assert_raises(KeyError):
+            namespace[[]]
+        with self.assert_raises(ValueError):
+            create_namespace_class(["foo", "foo"])
+
+    def test_slot_names(self):
+        cls = create_namespace_class(["foo-bar", "keys", "class", "_x", "y"])
+        self.assert_equal(
+            cls.__slots__, ("_field0", "_field1", "_field2", "_field3", "y")
+        )
+        namespace = cls({"foo-bar": 1, "keys": 2, "class": 3, "_x": 4})
+        self.assert_equal(
+            namespace.keys(), ["foo-bar", "keys", "class", "_x"]
+        )
+        self.assert_equal(namespace["keys"], 2)
+
+    def test_copy(self):
+        namespace = create_namespace_class(["foo", "bar"])(foo=[1])
+        for copied in [
+            namespace.copy(),
+            deepcopy(namespace),
+            pickle.loads(pickle.dumps(namespace, 2))
+        ]:
+            self.assert_is(copied.__class__, namespace.__class__)
+            self.assert_equal(copied, namespace)
+        self.assert_is_not(deepcopy(namespace).foo, namespace.foo)
+
+    def test_parse(self):
+        command = Tool()
+        kwargs = command.parse(["-v", "-n", "1", "-n", "2"])[2]
+        self.assert_is_instance(kwargs, Namespace)
+        self.assert_equal(kwargs.fields, ("verbose", "numbers"))
+        self.assert_equal(kwargs, {"verbose": True, "numbers": [1, 2]})
+
+        command_path, args, kwargs = command.parse(
+            ["-n", "1", "remote", "-u", "foo", "origin"], ["a"], {"spam": 1}
+        )
+        self.assert_equal(command_path, ("remote", ))
+        self.assert_equal(args, ["a", "origin"])
+        self.assert_equal(kwargs.fields, ("spam", "verbose", "numbers", "url"))
+        self.assert_equal(kwargs, {"spam": 1, "numbers": [1], "url": "foo"})
+        self.assert_equal(
+            command.run(["-v", "remote", "origin"]),
+            (("origin", ), {"verbose": True})
+        )
+
+    def test_compiled(self):
+        command = Tool()
+        parser = command.compile()
+        for arguments in [["-v"], ["-n", "1", "remote", "-u", "foo", "a"]]:
+            result = parser.parse(arguments)
+            self.assert_is_instance(result[2], Namespace)
+            self.assert_equal(result, command.parse(arguments))
+
+    def test_parse_cache(self):
+        class CachingTool(Tool):
+            parse_cache_size = 4
+        command = CachingTool()
+        first = command.parse(["-n", "1"])[2]
+        second = command.parse(["-n", "1"])[2]
+        self.assert_is_instance(second, Namespace)
+        self.assert_equal(first, second)
+        self.assert_is_not(first.numbers, second.numbers)
+
+
+suite = make_suite([NamespaceTestCase])
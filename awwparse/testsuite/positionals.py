@@ -57,6 +57,88 @@ class PositionalTestCase(TestCase):
         for part in parts:
             self.assert_in(part, r)
 
+    def test_slots(self):
+        positionals = [
+            Positional(), Bytes(), String(), NativeString(), Integer(),
+            Float(), Decimal(), Complex(), Number(), Boolean(),
+            Choice(String(), ["foo"]), Mapping(String(), {"foo": 1}), File(),
+            LocalResource(), Resource()
+        ]
+        for positional in positionals:
+            self.assert_false(hasattr(positional, "__dict__"))
+            copy = positional.copy()
+            self.assert_is_not(copy, positional)
+            self.assert_equal(repr(copy), repr(positional))
+
+    def test_stream(self):
+        command = TestCommand(options=[
+            ("foo", Option("-a", Integer(remaining=True, stream=True))),
+            ("bar", Option("-b", String()))
+        ])
+        args, kwargs = command.run(["-b", "spam", "-a", "1", "2", "-b"])
+        self.assert_equal(kwargs["bar"], u("spam"))
+        numbers = kwargs["foo"]
+        self.assert_false(isinstance(numbers, list))
+        self.assert_equal(next(numbers), 1)
+        self.assert_equal(next(numbers), 2)
+        with self.assert_raises(UserTypeError):
+            next(numbers)
+
+        class StreamingCommand(TestCommand):
+            positionals = [
+                String(metavar=u("foo")),
+                Integer(
+                    metavar=u("bar"), remaining=True, stream=True,
+                    chunk_size=2
+                )
+            ]
+
+        args, kwargs = StreamingCommand().run(["foo", "1", "2", "3"])
+        self.assert_equal(args[0], u("foo"))
+        self.assert_equal(list(args[1]), [[1, 2], [3]])
+
+        choice = Choice(Integer(), [1, 2], remaining=True, stream=True)
+        command = TestCommand(options=[("foo", Option("-a", choice))])
+        self.assert_equal(
+            list(command.run(["-a", "1", "2", "1"])[1]["foo"]),
+            [1, 2, 1]
+        )
+
+    def test_stream_errors(self):
+        class StreamingCLI(TestCLI):
+            positionals = [
+                Integer(metavar=u("foo"), remaining=True, stream=True)
+            ]
+
+        def exit(code):
+            raise SystemExit(code)
+
+        stringio = StringIO()
+        cli = StreamingCLI(
+            application_name=u("app"), stdout=stringio, stderr=stringio,
+            exit=exit
+        )
+        for parser in [cli, cli.compile()]:
+            stringio.seek(0)
+            stringio.truncate()
+            numbers = parser.run(["1", "foo"])[0][0]
+            self.assert_equal(next(numbers), 1)
+            with self.assert_raises(SystemExit):
+                next(numbers)
+            self.assert_true(stringio.getvalue().startswith(
+                u("Error: 'foo' is not an integer\nUsage: app")
+            ))
+            numbers = parser.run(["1", "foo"], passthrough_errors=True)[0][0]
+            with self.assert_raises(UserTypeError):
+                list(numbers)
+
+        state = cli.create_parser_state()
+        state.feed("1")
+        state.feed("2")
+        numbers = state.finish()[1][0]
+        self.assert_equal(list(numbers), [1, 2])
+
+
 def make_parse_test(positional, single, remaining, optional):
     def parse_test(self):
         command = TestCommand()
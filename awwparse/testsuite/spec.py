@@ -0,0 +1,170 @@
+# coding: utf-8
+"""
+    awwparse.testsuite.spec
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+import json
+import decimal
+
+from six import u
+
+from awwparse import (
+    Command, CLI, Option, LazyCommand, Integer, String, Boolean, Choice,
+    Mapping, Any, Number, File, Decimal, append_to_list
+)
+from awwparse.spec import load, dump, load_positional, dump_positional
+from awwparse.testsuite import TestCase, TestCommand, make_suite
+
+
+SPEC = {
+    "help": "Manages remotes",
+    "options": [
+        {
+            "name": "verbose",
+            "short": "-v",
+            "long": "--verbose",
+            "positionals": [{"type": "Boolean", "metavar": "verbose"}],
+            "help": "Be verbose"
+        },
+        {
+            "name": "tags",
+            "long": "--tag",
+            "positionals": [{"type": "String", "metavar": "tag"}],
+            "action": "append_to_list"
+        }
+    ],
+    "positionals": [
+        {"type": "String", "metavar": "name"},
+        {
+            "type": "Choice",
+            "argument": {"type": "String"},
+            "choices": ["fetch", "push"],
+            "metavar": "direction",
+            "optional": True
+        }
+    ],
+    "commands": [
+        {
+            "name": "add",
+            "help": "Adds a remote",
+            "positionals": [{"type": "Integer", "metavar": "count"}]
+        },
+        {
+            "name": "lazy",
+            "import_path": "awwparse.testsuite:TestCommand",
+            "help": "Loaded lazily"
+        }
+    ]
+}
+
+
+class SpecTestCase(TestCase):
+    def test_load(self):
+        command = load(SPEC)
+        self.assert_is_instance(command, Command)
+        self.assert_equal(command.help, "Manages remotes")
+        arguments = ["-v", "--tag", "a", "--tag", "b", "origin", "push"]
+        self.assert_equal(
+            command.parse(arguments),
+            ((), ["origin", "push"], {"verbose": True, "tags": ["a", "b"]})
+        )
+        self.assert_equal(
+            command.parse(["origin", "add", "1"]),
+            (("add", ), ["origin", 1], {})
+        )
+        self.assert_equal(command.commands["add"].help, "Adds a remote")
+        self.assert_is_instance(command.commands["lazy"], LazyCommand)
+        self.assert_is_instance(command.load_command("lazy"), TestCommand)
+
+    def test_load_json(self):
+        self.assert_equal(dump(load(json.dumps(SPEC))), SPEC)
+
+    def test_load_into(self):
+        cli = load(SPEC, CLI(application_name=u("app")))
+        self.assert_equal(
+            cli.get_usage(),
+            u("app [-h] [-v ] [--tag tag] {add,lazy} name direction")
+        )
+
+    def test_dump(self):
+        self.assert_equal(dump(load(SPEC)), SPEC)
+
+        command = Command(
+            options=[
+                ("foo", Option("-f", "--foo", Integer(), help=u("Foo"))),
+                ("bar", Option("-b", Choice(Integer(), [1, 2]),
+                               action=append_to_list))
+            ],
+            commands={"spam": TestCommand(positionals=[String(metavar="x")])},
+            positionals=[String(metavar="file", optional=True)]
+        )
+        command.add_command("eggs", "awwparse.testsuite:TestCommand")
+        loaded = load(dump(command))
+        self.assert_equal(dump(loaded), dump(command))
+        self.assert_equal(
+            loaded.parse(["-f", "1", "-b", "2", "-b", "1", "x", "spam", "y"]),
+            command.parse(["-f", "1", "-b", "2", "-b", "1", "x", "spam", "y"])
+        )
+
+    def test_positionals(self):
+        positionals = [
+            Integer(metavar="a", optional=True),
+            String(metavar="b", remaining=True, help=u("Things")),
+            Boolean(store=False),
+            Mapping(String(), {"a": 1}),
+            Any([Integer(), Decimal()], u("{argument!r} is no number")),
+            Number(use_decimal=True),
+            File(mode="w", encoding="utf-8")
+        ]
+        for positional in positionals:
+            spec = dump_positional(positional)
+            self.assert_equal(dump_positional(load_positional(spec)), spec)
+            self.assert_equal(
+                repr(load_positional(spec)), repr(positional)
+            )
+        self.assert_equal(dump_positional(Integer()), {"type": "Integer"})
+        self.assert_equal(
+            load_positional({"type": "Number", "use_decimal": True})
+                .convert("1.5"),
+            decimal.Decimal("1.5")
+        )
+
+    def test_errors(self):
+        with self.assert_raises(ValueError):
+            load_positional({"type": "Spam"})
+        with self.assert_raises(ValueError) as context:
+            load_positional({"metavar": "foo"})
+        self.assert_in("type missing", str(context.exception))
+        with self.assert_raises(ValueError) as context:
+            load({"commands": [{"name": "foo", "usage": "foo [bar]"}]})
+        self.assert_in("'usage'", str(context.exception))
+        with self.assert_raises(ValueError):
+            load({"usage": "foo"})
+        with self.assert_raises(ValueError):
+            load({"commands": [
+                {"name": "foo", "import_path": "spam:Eggs", "options": []}
+            ]})
+        with self.assert_raises(ValueError):
+            load({"options": [{"name": "foo", "long": "--foo", "spam": 1}]})
+        with self.assert_raises(ValueError):
+            load({"options": [{
+                "name": "foo",
+                "long": "--foo",
+                "positionals": [{"type": "Integer"}],
+                "action": "spam"
+            }]})
+
+        class Spam(Integer):
+            pass
+        with self.assert_raises(ValueError):
+            dump_positional(Spam())
+        with self.assert_raises(ValueError):
+            dump(Command(options=[
+                ("foo", Option("--foo", Integer(), action=lambda a, b: b))
+            ]))
+
+
+suite = make_suite([SpecTestCase])
@@ -6,10 +6,13 @@
     :copyright: 2012 by Daniel Neuhäuser
     :license: BSD, see LICENSE.rst for details
 """
+from six.moves import cPickle as pickle
+
 from awwparse.utils import (
     set_attributes, set_attributes_from_kwargs, missing, force_list,
     get_terminal_width, Signature, OrderedDict, iter_mapping, create_repr,
-    ensure_all
+    ensure_all, import_string, LRUCache, iter_chunks, _LinkedOrderedDict,
+    PrefixTrie, ImmutableMapping
 )
 from awwparse.testsuite import TestCase, make_suite, py3test
 
@@ -53,6 +56,13 @@ class UtilsTestCase(TestCase):
         self.assert_equal(force_list(1), [1])
         self.assert_equal(force_list("abc"), ["a", "b", "c"])
 
+    def test_iter_chunks(self):
+        self.assert_equal(list(iter_chunks([], 2)), [])
+        self.assert_equal(
+            list(iter_chunks(range(5), 2)),
+            [[0, 1], [2, 3], [4]]
+        )
+
     def test_get_terminal_width(self):
         # check that it doesn't raise an exception and returns an integer
         self.assert_is_instance(get_terminal_width(), int)
@@ -66,6 +76,23 @@ class UtilsTestCase(TestCase):
             list(iter_mapping({"foo": 1, "bar": 2})),
             [("foo", 1), ("bar", 2)]
         )
+        self.assert_equal(
+            list(iter_mapping(ImmutableMapping(OrderedDict([("foo", 1)])))),
+            [("foo", 1)]
+        )
+
+    def test_immutable_mapping(self):
+        mapping = ImmutableMapping({"foo": 1})
+        self.assert_equal(mapping["foo"], 1)
+        self.assert_equal(dict(mapping), {"foo": 1})
+        self.assert_equal(len(mapping), 1)
+        with self.assert_raises(TypeError):
+            mapping["bar"] = 2
+        with self.assert_raises(TypeError):
+            del mapping["foo"]
+        self.assert_false(hasattr(mapping, "update"))
+        self.assert_equal(pickle.loads(pickle.dumps(mapping)), {"foo": 1})
+        self.assert_equal(repr(mapping), "ImmutableMapping({'foo': 1})")
 
     def test_create_repr(self):
         self.assert_equal(create_repr("foo"), "foo()")
@@ -82,6 +109,17 @@ class UtilsTestCase(TestCase):
             "foo('bar', 'baz', spam='eggs')"
         )
 
+    def test_import_string(self):
+        self.assert_is(import_string("awwparse.utils:Signature"), Signature)
+        self.assert_is(
+            import_string("awwparse.utils:Signature.from_function").__func__,
+            Signature.from_function.__func__
+        )
+        with self.assert_raises(ValueError):
+            import_string("awwparse.utils.Signature")
+        with self.assert_raises(ImportError):
+            import_string("awwparse.utils:DoesNotExist")
+
     def test_ensure_names(self):
         with self.assert_raises(AssertionError):
             ensure_all(["name_that_does_not_exist"])
@@ -174,20 +212,127 @@ class SignatureTestCase(TestCase):
         )
 
 
-class OrderedDictTestCase(TestCase):
+class OrderedDictTestMixin(object):
+    ordered_dict = None
+
+    def test_order(self):
+        d = self.ordered_dict([("foo", 1), ("bar", 2)])
+        d["baz"] = 3
+        self.assert_equal(list(d), ["foo", "bar", "baz"])
+        self.assert_equal(list(reversed(d)), ["baz", "bar", "foo"])
+        del d["bar"]
+        d["bar"] = 4
+        self.assert_equal(list(d.items()), [("foo", 1), ("baz", 3), ("bar", 4)])
+        self.assert_equal(d, {"foo": 1, "bar": 4, "baz": 3})
+
     def test_popitem(self):
-        d = OrderedDict([("foo", 1), ("bar", 2), ("baz", 3)])
+        d = self.ordered_dict([("foo", 1), ("bar", 2), ("baz", 3)])
         self.assert_equal(d.popitem(), ("baz", 3))
-        self.assert_equal(d, OrderedDict([("foo", 1), ("bar", 2)]))
+        self.assert_equal(list(d.items()), [("foo", 1), ("bar", 2)])
         self.assert_equal(d.popitem(last=False), ("foo", 1))
-        self.assert_equal(d, OrderedDict([("bar", 2)]))
+        self.assert_equal(list(d.items()), [("bar", 2)])
+        d.clear()
+        with self.assert_raises(KeyError):
+            d.popitem()
+        with self.assert_raises(KeyError):
+            d.popitem(last=False)
 
     def test_move_to_end(self):
-        d = OrderedDict([("foo", 1), ("bar", 2), ("baz", 3)])
+        d = self.ordered_dict([("foo", 1), ("bar", 2), ("baz", 3)])
         d.move_to_end("foo")
-        self.assert_equal(d, OrderedDict([("bar", 2), ("baz", 3), ("foo", 1)]))
+        self.assert_equal(list(d.items()), [("bar", 2), ("baz", 3), ("foo", 1)])
         d.move_to_end("foo", last=False)
-        self.assert_equal(d, OrderedDict([("foo", 1), ("bar", 2), ("baz", 3)]))
+        self.assert_equal(list(d.items()), [("foo", 1), ("bar", 2), ("baz", 3)])
+        with self.assert_raises(KeyError):
+            d.move_to_end("spam")
+
+    def test_pickle(self):
+        d = self.ordered_dict([("foo", 1), ("bar", 2)])
+        loaded = pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+        self.assert_equal(list(loaded.items()), list(d.items()))
+
+    def test_repr(self):
+        d = self.ordered_dict([("foo", 1)])
+        self.assert_equal(
+            repr(d), "{0}([('foo', 1)])".format(self.ordered_dict.__name__)
+        )
+
+
+class OrderedDictTestCase(OrderedDictTestMixin, TestCase):
+    ordered_dict = OrderedDict
+
+
+class LinkedOrderedDictTestCase(OrderedDictTestMixin, TestCase):
+    ordered_dict = _LinkedOrderedDict
+
+
+class LRUCacheTestCase(TestCase):
+    def test_get(self):
+        cache = LRUCache(2)
+        self.assert_is(cache.get("foo"), None)
+        self.assert_equal(cache.get("foo", 1), 1)
+        cache["foo"] = 2
+        self.assert_equal(cache.get("foo"), 2)
+        self.assert_equal((cache.hits, cache.misses), (1, 2))
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache["foo"] = 1
+        cache["bar"] = 2
+        cache.get("foo")
+        cache["baz"] = 3
+        self.assert_equal(len(cache), 2)
+        self.assert_in("foo", cache)
+        self.assert_not_in("bar", cache)
+        self.assert_equal(cache.evictions, 1)
+
+        cache.clear()
+        self.assert_equal(len(cache), 0)
+        self.assert_equal(cache.evictions, 1)
+
+        with self.assert_raises(ValueError):
+            LRUCache(0)
+
+
+class PrefixTrieTestCase(TestCase):
+    def test_mapping(self):
+        trie = PrefixTrie([("--foo", 1), ("--foobar", 2)])
+        self.assert_equal(len(trie), 2)
+        self.assert_equal(trie["--foo"], 1)
+        self.assert_in("--foobar", trie)
+        self.assert_not_in("--fo", trie)
+        with self.assert_raises(KeyError):
+            trie["--fo"]
+        trie["--foo"] = 3
+        self.assert_equal(len(trie), 2)
+        self.assert_equal(trie["--foo"], 3)
+
+    def test_iter_keys(self):
+        trie = PrefixTrie({"--spam": 1, "--foo": 2, "--foobar": 3, "-f": 4})
+        self.assert_equal(
+            list(trie.iter_keys()), ["--foo", "--foobar", "--spam", "-f"]
+        )
+        self.assert_equal(list(trie.iter_keys("--f")), ["--foo", "--foobar"])
+        self.assert_equal(list(trie.iter_keys("--x")), [])
+
+    def test_lookup(self):
+        trie = PrefixTrie({"--verbose": 1, "--version": 2, "--verb": 3})
+        self.assert_equal(trie.lookup("--verbo"), ["--verbose"])
+        self.assert_equal(trie.lookup("--verb"), ["--verb"])
+        self.assert_equal(trie.lookup("--versio"), ["--version"])
+        self.assert_equal(
+            trie.lookup("--ver"), ["--verb", "--verbose", "--version"]
+        )
+        self.assert_equal(trie.lookup("--x"), [])
+
+    def test_repr(self):
+        self.assert_equal(
+            repr(PrefixTrie([("b", 1), ("a", 2)])),
+            "PrefixTrie([('a', 2), ('b', 1)])"
+        )
 
 
-suite = make_suite([UtilsTestCase, SignatureTestCase, OrderedDictTestCase])
+suite = make_suite([
+    UtilsTestCase, SignatureTestCase, OrderedDictTestCase,
+    LinkedOrderedDictTestCase, LRUCacheTestCase, PrefixTrieTestCase
+])
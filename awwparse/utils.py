@@ -8,10 +8,15 @@
 """
 from __future__ import absolute_import
 import os
+import sys
 import math
-import inspect
-from itertools import takewhile
-from collections import MutableMapping
+import threading
+import collections
+from itertools import takewhile, islice
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    from collections import Mapping, MutableMapping
 try:
     from itertools import zip_longest
 except ImportError:
@@ -76,6 +81,19 @@ def force_list(object):
         return [object]
 
 
+def iter_chunks(iterable, size):
+    """
+    Yields lists of `size` items from `iterable`, the last list may be
+    shorter.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def get_terminal_width(default_width=80):
     """
     Returns the width of the terminal.
@@ -98,12 +116,14 @@ def golden_split(n):
     return large, small
 
 
-try:
-    _getargspec = inspect.getfullargspec
-    _ArgSpec = inspect.FullArgSpec
-except AttributeError:
-    _getargspec = inspect.getargspec
-    _ArgSpec = inspect.ArgSpec
+def _getargspec(function):
+    # inspect takes longer to import than the rest of awwparse, so we import
+    # it once we actually have to look at a signature
+    import inspect
+    try:
+        return inspect.getfullargspec(function)
+    except AttributeError:
+        return inspect.getargspec(function)
 
 
 class Signature(object):
@@ -173,7 +193,7 @@ class Signature(object):
         """
         argspec = _getargspec(method)
         return cls._add_annotations(cls._from_argspec(
-            _ArgSpec(
+            argspec.__class__(
                 argspec.args[1:],
                 *list(argspec)[1:]
             ),
@@ -211,8 +231,30 @@ class Signature(object):
         return result
 
 
+def import_string(import_path):
+    """
+    Imports and returns the object referred to by `import_path` which has the
+    form ``"package.module:name"``, `name` may be a dotted path to an attribute
+    of an object within the module.
+    """
+    module_name, colon, name = import_path.partition(":")
+    if not colon or not module_name or not name:
+        raise ValueError(
+            "expected 'package.module:name', got {0!r}".format(import_path)
+        )
+    object = __import__(module_name, None, None, ["__name__"])
+    try:
+        for attribute in name.split("."):
+            object = getattr(object, attribute)
+    except AttributeError:
+        raise ImportError("cannot import {0!r}".format(import_path))
+    return object
+
+
 def iter_mapping(mapping):
-    return mapping.items() if isinstance(mapping, dict) else mapping
+    if isinstance(mapping, (dict, Mapping)):
+        return mapping.items()
+    return mapping
 
 
 def create_repr(name, args=None, kwargs=None):
@@ -229,6 +271,8 @@ def create_repr(name, args=None, kwargs=None):
 
 
 class _Link(object):
+    __slots__ = ("prev", "key", "next")
+
     def __init__(self, prev=None, key=None, next=None):
         self.prev = self if prev is None else prev
         self.key = key
@@ -252,7 +296,11 @@ class _Link(object):
         self.next = self.prev = None
 
 
-class OrderedDict(MutableMapping, dict):
+class _LinkedOrderedDict(MutableMapping, dict):
+    """
+    An ordered dictionary keeping track of the order of keys with a linked
+    list, for Pythons whose dictionaries are not ordered.
+    """
     def __init__(self, *args, **kwargs):
         MutableMapping.__init__(self)
         dict.__init__(self)
@@ -291,7 +339,7 @@ class OrderedDict(MutableMapping, dict):
     def clear(self):
         self._root = _Link()
         self._map.clear()
-        MutableMapping.clear(self)
+        dict.clear(self)
 
     def popitem(self, last=True):
         if not self:
@@ -309,11 +357,281 @@ class OrderedDict(MutableMapping, dict):
         else:
             self._root.next.add_before(moving)
 
+    def __reduce__(self):
+        return self.__class__, (list(self.items()), )
+
+    def __repr__(self):
+        return "{0}({1!r})".format(self.__class__.__name__, list(self.items()))
+
+
+class _NativeOrderedDict(dict):
+    """
+    An ordered dictionary relying on dictionaries preserving insertion order,
+    which they do since Python 3.7.
+
+    Moving a key to the beginning is O(n). Removing the first item with
+    ``popitem(last=False)`` has to skip over the entries that have been
+    deleted since the dictionary was last resized, so it gets slower if done
+    repeatedly. Everything else performs like :class:`dict`.
+    """
+    __slots__ = ()
+
+    if not hasattr(dict, "__reversed__"):
+        # dictionaries are reversible since Python 3.8
+        def __reversed__(self):
+            return reversed(list(self))
+
+    def popitem(self, last=True):
+        if last:
+            return dict.popitem(self)
+        if not self:
+            raise KeyError("dict is empty")
+        key = next(iter(self))
+        return key, self.pop(key)
+
+    def move_to_end(self, key, last=True):
+        value = self.pop(key)
+        if last:
+            self[key] = value
+        else:
+            items = list(self.items())
+            self.clear()
+            self[key] = value
+            self.update(items)
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()), )
+
     def __repr__(self):
         return "{0}({1!r})".format(self.__class__.__name__, list(self.items()))
 
 
+if sys.version_info >= (3, 7):
+    _OrderedDictBase = _NativeOrderedDict
+else:
+    _OrderedDictBase = _LinkedOrderedDict
+
+
+class OrderedDict(_OrderedDictBase):
+    """
+    A dictionary that remembers the order in which keys were inserted, with
+    the :meth:`move_to_end` and :meth:`popitem` API of
+    :class:`collections.OrderedDict`.
+
+    Unlike :class:`collections.OrderedDict` equality does not depend on order.
+    """
+    __slots__ = ()
+
+
+class ImmutableMapping(Mapping):
+    """
+    A read-only view of the given `mapping`.
+    """
+    __slots__ = ("_mapping", )
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+    def __getitem__(self, key):
+        return self._mapping[key]
+
+    def __iter__(self):
+        return iter(self._mapping)
+
+    def __len__(self):
+        return len(self._mapping)
+
+    def __reduce__(self):
+        return self.__class__, (self._mapping, )
+
+    def __repr__(self):
+        return "{0}({1!r})".format(self.__class__.__name__, self._mapping)
+
+
+if hasattr(getattr(collections, "OrderedDict", None), "move_to_end"):
+    # removes the first item in O(1), whereas :class:`_NativeOrderedDict` has
+    # to skip over the entries that have been deleted before
+    _LRUOrderedDict = collections.OrderedDict
+else:
+    _LRUOrderedDict = _LinkedOrderedDict
+
+
+class LRUCache(object):
+    """
+    A cache holding up to `maxsize` items, discarding the least recently used
+    item once it is full.
+
+    The number of :attr:`hits`, :attr:`misses` and :attr:`evictions` is
+    recorded for inspection. The cache may be shared between threads.
+    """
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("maxsize has to be positive: {0!r}".format(maxsize))
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = _LRUOrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the item for `key` or `default` if there is none.
+        """
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        """
+        Removes all items, the statistics are kept.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return create_repr(self.__class__.__name__, [self.maxsize], {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        })
+
+
+class _TrieNode(object):
+    __slots__ = ("children", "key", "value", "size", "some_key")
+
+    def __init__(self):
+        self.children = {}
+        self.key = missing
+        self.value = None
+        #: The number of keys in this subtree.
+        self.size = 0
+        #: A key in this subtree, the only one if :attr:`size` is ``1``.
+        self.some_key = None
+
+
+class PrefixTrie(object):
+    """
+    Maps strings to values and efficiently finds keys by (unique) prefix.
+    """
+    __slots__ = ("_root", )
+
+    def __init__(self, items=()):
+        self._root = _TrieNode()
+        for key, value in iter_mapping(items):
+            self[key] = value
+
+    def _find_node(self, prefix):
+        node = self._root
+        for character in prefix:
+            node = node.children.get(character)
+            if node is None:
+                return None
+        return node
+
+    def __setitem__(self, key, value):
+        node = self._find_node(key)
+        is_new = node is None or node.key is missing
+        path = [self._root]
+        node = self._root
+        for character in key:
+            node = node.children.setdefault(character, _TrieNode())
+            path.append(node)
+        node.key = key
+        node.value = value
+        if is_new:
+            for node in path:
+                node.size += 1
+                if node.size == 1:
+                    node.some_key = key
+
+    def __getitem__(self, key):
+        node = self._find_node(key)
+        if node is None or node.key is missing:
+            raise KeyError(key)
+        return node.value
+
+    def __contains__(self, key):
+        node = self._find_node(key)
+        return node is not None and node.key is not missing
+
+    def __len__(self):
+        return self._root.size
+
+    def iter_keys(self, prefix=""):
+        """
+        Iterates over all keys starting with `prefix` in sorted order.
+        """
+        node = self._find_node(prefix)
+        if node is None:
+            return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.key is not missing:
+                yield node.key
+            stack.extend(
+                child for _, child in
+                sorted(node.children.items(), reverse=True)
+            )
+
+    def lookup(self, prefix):
+        """
+        Returns a list with the key that is `prefix` or otherwise the key
+        starting with `prefix` if there is exactly one such key.
+
+        If there is no such key an empty list is returned, if there are
+        several keys starting with `prefix` all of them are returned.
+
+        Unless there are several keys, this takes O(len(prefix)) time
+        independent of the number of keys.
+        """
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        if node.key is not missing or node.size == 1:
+            return [node.some_key if node.key is missing else node.key]
+        return list(self.iter_keys(prefix))
+
+    def __repr__(self):
+        return "{0}({1!r})".format(
+            self.__class__.__name__,
+            [(key, self[key]) for key in self.iter_keys()]
+        )
+
+
 def ensure_all(names):
+    import inspect
     namespace = set()
     namespace.update(dir(builtins))
     for frame, _, _, _, _, _ in inspect.stack():
@@ -0,0 +1,68 @@
+# coding: utf-8
+"""
+    benchmarks.import_time
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures how long ``import awwparse`` takes in a fresh interpreter and
+    exits with a non-zero status if the median exceeds the budget.
+
+    Usage: python benchmarks/import_time.py [budget in milliseconds]
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import print_function
+import os
+import sys
+import subprocess
+
+
+#: The import time budget in milliseconds.
+DEFAULT_BUDGET = 25.0
+#: The number of fresh interpreters in which the import is measured.
+RUNS = 15
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = """
+import time
+start = time.time()
+import awwparse
+print((time.time() - start) * 1000)
+"""
+
+
+def measure_import_time():
+    environment = os.environ.copy()
+    # we want to measure importing, not compiling
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [PROJECT_PATH] + environment.get("PYTHONPATH", "").split(os.pathsep)
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", MEASURE],
+        stdout=subprocess.PIPE,
+        env=environment
+    )
+    output = process.communicate()[0]
+    if process.returncode != 0:
+        raise RuntimeError("importing awwparse failed")
+    return float(output)
+
+
+def main(argv):
+    budget = float(argv[1]) if len(argv) > 1 else DEFAULT_BUDGET
+    # the first run may have to write bytecode, which we don't want to measure
+    measure_import_time()
+    timings = sorted(measure_import_time() for _ in range(RUNS))
+    median = timings[len(timings) // 2]
+    print("import awwparse: min {0:.2f}ms, median {1:.2f}ms, budget {2:.2f}ms"
+          .format(timings[0], median, budget))
+    if median > budget:
+        print("import time budget exceeded", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,186 @@
+# coding: utf-8
+"""
+    benchmarks.memory
+    ~~~~~~~~~~~~~~~~~
+
+    Measures how many bytes options and commands take up, once with the
+    slotted classes of awwparse and once with a copy of awwparse from which
+    all ``__slots__`` declarations have been removed, so that the classes are
+    defined as they were before they declared ``__slots__``. The copy is
+    measured in a fresh interpreter.
+
+    The allocated memory is traced with :mod:`tracemalloc` if available,
+    otherwise the sizes of the objects that have been created are summed up.
+
+    Usage: python benchmarks/memory.py [number of objects]
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import print_function
+import os
+import re
+import io
+import sys
+import gc
+import json
+import shutil
+import tempfile
+import subprocess
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: If set, awwparse is imported from this directory instead of the project.
+AWWPARSE_PATH = os.environ.get("BENCHMARK_AWWPARSE_PATH", PROJECT_PATH)
+
+sys.path.insert(0, AWWPARSE_PATH)
+
+from awwparse import Command, Option, Integer, String, Choice
+
+
+_slots_re = re.compile(r"^(\s*)__slots__ = ", re.MULTILINE)
+
+
+def create_unslotted_copy(directory):
+    """
+    Copies the awwparse package into `directory`, renaming the ``__slots__``
+    class attributes so that they no longer have an effect.
+    """
+    target = os.path.join(directory, "awwparse")
+    shutil.copytree(
+        os.path.join(PROJECT_PATH, "awwparse"), target,
+        ignore=shutil.ignore_patterns("*.pyc", "__pycache__", "testsuite")
+    )
+    for filename in os.listdir(target):
+        if not filename.endswith(".py"):
+            continue
+        path = os.path.join(target, filename)
+        with io.open(path, encoding="utf-8") as file:
+            source = file.read()
+        with io.open(path, "w", encoding="utf-8") as file:
+            file.write(_slots_re.sub(r"\1_unused_slots = ", source))
+
+
+def warm_up(create):
+    # caches filled by the first objects should not be measured
+    for i in range(10):
+        create(i)
+
+
+def measure_traced(create, count):
+    warm_up(create)
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [create(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del objects
+    return size / float(count)
+
+
+def measure_reachable(create, count):
+    warm_up(create)
+    gc.collect()
+    # objects that exist already, such as classes or shared options, are not
+    # counted, the list keeps them alive so that their ids are not reused
+    existing = gc.get_objects()
+    seen = set(map(id, existing))
+    seen.update(id(referent) for referent in gc.get_referents(*existing))
+    objects = [create(i) for i in range(count)]
+    size = 0
+    unvisited = list(objects)
+    while unvisited:
+        obj = unvisited.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        unvisited.extend(gc.get_referents(obj))
+    del objects, existing
+    return size / float(count)
+
+
+if tracemalloc is None:
+    measure = measure_reachable
+else:
+    measure = measure_traced
+
+
+def create_option(i):
+    return Option("--option-{0}".format(i), String(), Integer(optional=True))
+
+
+def create_options():
+    return [
+        ("verbose", Option("-v", "--verbose", Integer())),
+        ("config", Option("-c", "--config", String())),
+        ("region", Option("-r", "--region", Choice(String(), ["eu", "us"])))
+    ]
+
+
+def create_command(i):
+    return Command(options=create_options())
+
+
+global_options = create_options()
+
+
+def create_subcommand(i):
+    return Command(options=global_options)
+
+
+BENCHMARKS = [
+    ("bytes per option", create_option, 1),
+    ("bytes per command with 3 options", create_command, 10),
+    ("bytes per command sharing 3 options", create_subcommand, 10)
+]
+
+
+def measure_all(count):
+    return [
+        measure(create, count // divisor)
+        for name, create, divisor in BENCHMARKS
+    ]
+
+
+def measure_unslotted(count):
+    directory = tempfile.mkdtemp()
+    try:
+        create_unslotted_copy(directory)
+        environment = os.environ.copy()
+        environment["BENCHMARK_AWWPARSE_PATH"] = directory
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--json", str(count)],
+            stdout=subprocess.PIPE,
+            env=environment
+        )
+        output = process.communicate()[0]
+    finally:
+        shutil.rmtree(directory)
+    if process.returncode != 0:
+        raise RuntimeError("measuring the unslotted classes failed")
+    return json.loads(output.decode("utf-8"))
+
+
+def main(argv):
+    if argv[1:2] == ["--json"]:
+        print(json.dumps(measure_all(int(argv[2]))))
+        return
+    count = int(argv[1]) if len(argv) > 1 else 10000
+    print("measured with {0}".format(
+        "tracemalloc" if measure is measure_traced else "sys.getsizeof"
+    ))
+    print("{0:<40}{1:>10}{2:>12}".format("", "slotted", "unslotted"))
+    results = zip(BENCHMARKS, measure_all(count), measure_unslotted(count))
+    for (name, _, _), slotted, unslotted in results:
+        print("{0:<40}{1:>10.0f}{2:>12.0f}".format(name, slotted, unslotted))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,87 @@
+# coding: utf-8
+"""
+    benchmarks.ordered_dict
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compares inserting, deleting and iterating over entries of the ordered
+    dictionary implementations in :mod:`awwparse.utils`, as well as replacing
+    the oldest entry with a new one, as :class:`awwparse.utils.LRUCache` does
+    once it is full.
+
+    Usage: python benchmarks/ordered_dict.py [number of entries]
+
+    :copyright: 2012 by Daniel Neuhäuser
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import print_function
+import os
+import sys
+import timeit
+import collections
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from awwparse.utils import OrderedDict, _LinkedOrderedDict
+
+
+#: The number of times each operation is repeated, the best run is reported.
+REPEAT = 5
+
+IMPLEMENTATIONS = [
+    ("awwparse.utils.OrderedDict", OrderedDict),
+    ("linked list", _LinkedOrderedDict),
+    ("collections.OrderedDict", collections.OrderedDict)
+]
+
+
+def insert(ordered_dict, keys):
+    d = ordered_dict()
+    for key in keys:
+        d[key] = key
+    return d
+
+
+def delete(d, keys):
+    for key in keys:
+        del d[key]
+
+
+def iterate(d):
+    for _ in d:
+        pass
+
+
+def churn(d, keys):
+    for key in keys:
+        d.popitem(last=False)
+        d[key] = key
+
+
+def best_of(function, setup):
+    timings = []
+    for _ in range(REPEAT):
+        arguments = setup()
+        timings.append(timeit.timeit(lambda: function(*arguments), number=1))
+    return min(timings) * 1000
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 10000
+    keys = ["--option-{0}".format(i) for i in range(count)]
+    new_keys = ["--new-option-{0}".format(i) for i in range(count)]
+    print("{0} entries, best of {1}, in milliseconds".format(count, REPEAT))
+    print("{0:<28}{1:>10}{2:>10}{3:>10}{4:>10}".format(
+        "", "insert", "delete", "iterate", "churn"
+    ))
+    for name, ordered_dict in IMPLEMENTATIONS:
+        print("{0:<28}{1:>10.2f}{2:>10.2f}{3:>10.2f}{4:>10.2f}".format(
+            name,
+            best_of(insert, lambda: (ordered_dict, keys)),
+            best_of(delete, lambda: (insert(ordered_dict, keys), keys)),
+            best_of(iterate, lambda: (insert(ordered_dict, keys), )),
+            best_of(churn, lambda: (insert(ordered_dict, keys), new_keys))
+        ))
+
+
+if __name__ == "__main__":
+    main(sys.argv)